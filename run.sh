@@ -1,11 +1,29 @@
 CORPUS_DIR=./data/penn-parsed-corpus-of-historical-yiddish/data
 NEW_CORPUS_DIR=./out
 
-python ./src/modify_psd/modify_psd.py ${CORPUS_DIR} ${NEW_CORPUS_DIR}
-python ./src/prep_psd/prep_psd.py ${NEW_CORPUS_DIR}
-python ./src/mod_leaves/make_json.py ${NEW_CORPUS_DIR}
-python ./src/write_files/write_pos.py ${NEW_CORPUS_DIR}
-python ./src/write_files/write_flat_trees.py ${NEW_CORPUS_DIR}
-./src/write_files/pp_psd.sh ${NEW_CORPUS_DIR}
-python ./src/write_files/write_pos_word_counts.py ${NEW_CORPUS_DIR}
-python ./src/write_files/count_chars.py ${NEW_CORPUS_DIR}
+# Add --profile to any of the python stages to add their timings to
+# ${NEW_CORPUS_DIR}/tmp/profile.json (see src/profiling.py).
+# modify_psd.py, prep_psd.py and make_json.py in one process.
+# Add --keep-tmp to also write the tmp/mod_psd and tmp/prep_psd files, or
+# run the three stages separately:
+# python ./src/modify_psd/modify_psd.py ${CORPUS_DIR} ${NEW_CORPUS_DIR}
+# python ./src/prep_psd/prep_psd.py ${NEW_CORPUS_DIR}
+# python ./src/mod_leaves/make_json.py ${NEW_CORPUS_DIR}
+python ./src/make_corpus.py ${CORPUS_DIR} ${NEW_CORPUS_DIR}
+# write_pos.py, write_flat_trees.py, write_pos_word_counts.py and
+# count_chars.py in one pass over the json files, also pretty-printing the
+# trees into data/psd as pp_psd.sh did with CorpusSearch. Each can also
+# still be run on its own:
+# python ./src/write_files/write_pos.py ${NEW_CORPUS_DIR}
+# python ./src/write_files/write_flat_trees.py ${NEW_CORPUS_DIR}
+# python ./src/write_files/write_pos_word_counts.py ${NEW_CORPUS_DIR}
+# python ./src/write_files/count_chars.py ${NEW_CORPUS_DIR}
+# python ./src/write_files/pp_psd.py ${NEW_CORPUS_DIR}
+# (or ./src/write_files/pp_psd.sh ${NEW_CORPUS_DIR} with java installed)
+# check the pretty-printing against CorpusSearch's output for the fixture files
+python ./src/write_files/pp_psd.py --check-fixture
+python ./src/write_files/write_all.py ${NEW_CORPUS_DIR}
+# To time the stages on a synthetic corpus the size of the PPCHY (or
+# --scale times it), and compare with a saved baseline:
+# python ./src/benchmark/run_benchmark.py ./benchmark --save-baseline
+# python ./src/benchmark/run_benchmark.py ./benchmark
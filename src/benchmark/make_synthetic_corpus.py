@@ -0,0 +1,296 @@
+"""Write a synthetic corpus of .psd files in the form of the PPCHY
+
+Writes
+<out_dir> / FILE.psd
+for --files files with --scale times PPCHY_TREES trees in all, for
+benchmarking the pipeline without the PPCHY checkout (see
+run_benchmark.py).  The words are made up, but the trees have the things
+the stages spend their time on:
+- a mix of the PPCHY tags, with function tags and indices
+- leaves split with @, like (P far@) (NP (D @a) ...), for merge_leaves
+- the contractions and names/numbers that modify_psd changes, like
+  (NP-SBJ (ES 's)) (MDF vet) and (NPR avrom-yankev)
+- glosses, like (N khasene^wedding)
+- (CODE ...) nodes, and trees that are just a (CODE <P_...>)
+- empty subjects and traces, like *pro* and (NP-SBJ *T*-1)
+- tree IDs
+
+Two of the files are named 1910e-grine-felder.psd and
+1947e-royte-pomerantsen.psd, since modify_psd only changes those, and
+count_chars and write_pos_word_counts only use them.  The file sizes are
+skewed like the PPCHY's, with a few files having most of the trees.  The
+same --seed gives the same corpus.
+"""
+import os
+import sys
+import random
+import logging
+import argparse
+import pathlib
+from itertools import accumulate
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent / 'write_files'))
+# pylint: disable=wrong-import-position
+from pp_psd import TreePrinter
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# a rough stand-in for the # of trees in the PPCHY, for --scale
+PPCHY_TREES = 100000
+NUM_FILES = 20
+
+SPECIAL_FILES = ['1910e-grine-felder', '1947e-royte-pomerantsen']
+
+ONSETS = ['', 'b', 'd', 'f', 'g', 'h', 'k', 'kh', 'l', 'm', 'n', 'p', 'r',
+          's', 'sh', 't', 'ts', 'tsh', 'v', 'z', 'zh', 'shr', 'bl', 'gr', 'shl']
+NUCLEI = ['a', 'e', 'i', 'o', 'u', 'ay', 'ey', 'oy']
+CODAS = ['', '', 'n', 'r', 'l', 'kh', 't', 'm', 'sh', 'ts', 'nt', 'rt']
+
+# closed-class words, by tag
+CLOSED = {
+    'PRO': ['ikh', 'er', 'zi', 'mir', 'ir', 'du', 'im', 'es', 'zey'],
+    'D': ['der', 'di', 'dos', 'dem', 'a', 'an'],
+    'P': ['in', 'fun', 'mit', 'oyf', 'tsu', 'far', 'nokh', 'bay'],
+    'C': ['az', 'vos', 'ven', 'vayl'],
+    'CONJ': ['un', 'oder', 'nor'],
+    'NEG': ['nit', 'nisht'],
+    'Q': ['ale', 'vi', 'keyner', 'etlekhe'],
+    'FP': ['zhe', 'ot'],
+    'WPRO': ['vos', 'ver'],
+    'NUM': ['eyn', 'tsvey', 'dray', 'fir', 'finf', 'tsen', 'hundert'],
+}
+# finite verbs that the contraction rules know
+FINITE = {
+    'BEF': ['iz', 'bin', 'zaynen'],
+    'HVF': ['hot', 'hob', 'hobn'],
+    'MDF': ['vet', 'vel', 'vil', 'ken', 'muz', 'zol'],
+}
+# P + D/PRO splits that merge_leaves puts back together
+SPLITS = [('P', 'far', 'D', 'a'), ('P', 'nokh', 'PRO', 'dem'),
+          ('P', 'tsu', 'N', None), ('P', 'in', 'D', 'n'), ('P', 'fun', 'D', 'm')]
+GLOSSES = ['wedding', 'study_house', 'holiday', 'rabbi', 'sabbath', 'prayer', 'book']
+
+
+class Vocab:
+    """Made-up words for the open-class tags, picked with a Zipf distribution
+
+    Parameters
+    ==========
+    rng: Random
+    size: int
+        # of words for each tag
+    """
+    def __init__(self, rng, size):
+        self.rng = rng
+        self.tag2words = {tag: [self.make_word(suffix) for _ in range(size)]
+                          for (tag, suffix) in (('N', ''), ('ADJ', 'e'), ('ADV', ''),
+                                                ('VBF', 't'), ('VB', 'n'), ('VAN', 'n'),
+                                                ('NPR', ''))}
+        self.cum_weights = list(accumulate(1 / rank for rank in range(1, size + 1)))
+
+    def make_word(self, suffix):
+        """A word of one to three syllables"""
+        syllables = [self.rng.choice(ONSETS) + self.rng.choice(NUCLEI)
+                     for _ in range(self.rng.randint(1, 3))]
+        return ''.join(syllables) + self.rng.choice(CODAS) + suffix
+
+    def word(self, tag):
+        """A word for an open-class tag"""
+        return self.rng.choices(self.tag2words[tag], cum_weights=self.cum_weights)[0]
+
+
+class TreeMaker:
+    """Makes random flat trees
+
+    Parameters
+    ==========
+    rng: Random
+    vocab: Vocab
+    """
+    def __init__(self, rng, vocab):
+        self.rng = rng
+        self.vocab = vocab
+        # the next movement index in the tree
+        self.index = 1
+
+    def closed(self, tag):
+        """(tag word) for a closed-class tag"""
+        return f'({tag} {self.rng.choice(CLOSED[tag])})'
+
+    def noun(self):
+        """(N word), sometimes with a gloss"""
+        word = self.vocab.word('N')
+        if self.rng.random() < 0.05:
+            word = f'{word}^{self.rng.choice(GLOSSES)}'
+        return f'(N {word})'
+
+    def name(self):
+        """(NPR word), sometimes a two or three part name"""
+        parts = [self.vocab.word('NPR') for _ in range(self.rng.choice((1, 1, 2, 3)))]
+        return f"(NPR {'-'.join(parts)})"
+
+    def noun_phrase(self, label, depth):
+        """An NP"""
+        rnd = self.rng.random()
+        if rnd < 0.15:
+            return f'({label} {self.closed("PRO")})'
+        if rnd < 0.22:
+            return f'({label} {self.name()})'
+        if rnd < 0.27:
+            nums = '_'.join(self.rng.choice(CLOSED['NUM']) for _ in range(self.rng.randint(2, 3)))
+            return f'({label} (NUMP (NUM {nums})) {self.noun()})'
+        parts = [self.closed('D')]
+        if self.rng.random() < 0.3:
+            parts.append(f"(ADJ {self.vocab.word('ADJ')})")
+        parts.append(self.noun())
+        if depth < 2 and self.rng.random() < 0.15:
+            parts.append(self.relative(depth + 1))
+        elif depth < 2 and self.rng.random() < 0.15:
+            parts.append(self.prep_phrase(depth + 1))
+        return f"({label} {' '.join(parts)})"
+
+    def prep_phrase(self, depth):
+        """A PP, sometimes with the P split from the next word"""
+        if self.rng.random() < 0.2:
+            (pos1, word1, pos2, word2) = self.rng.choice(SPLITS)
+            if word2 is None:
+                word2 = self.vocab.word(pos2)
+            return f'(PP ({pos1} {word1}@) (NP ({pos2} @{word2})))'
+        return f"(PP {self.closed('P')} {self.noun_phrase('NP', depth)})"
+
+    def relative(self, depth):
+        """A relative clause, with a trace"""
+        index = self.index
+        self.index += 1
+        return (f'(CP-REL (WNP-{index} 0) (C az) '
+                f'(IP-SUB (NP-SBJ *T*-{index}) {self.verb()} '
+                f'{self.noun_phrase("NP-OB1", depth)}))')
+
+    def verb(self):
+        """A finite verb"""
+        if self.rng.random() < 0.6:
+            return f"(VBF {self.vocab.word('VBF')})"
+        tag = self.rng.choice(list(FINITE))
+        return f'({tag} {self.rng.choice(FINITE[tag])})'
+
+    def subject_and_verb(self):
+        """The subject and finite verb, sometimes a contraction"""
+        rnd = self.rng.random()
+        if rnd < 0.05:
+            return "(NP-SBJ (ES 's)) (MDF vet)"
+        if rnd < 0.08:
+            return "(NP-SBJ (PRO ikh)) (MDF 'l)"
+        if rnd < 0.15:
+            return f'(NP-SBJ *pro*) {self.verb()}'
+        return f'{self.noun_phrase("NP-SBJ", 0)} {self.verb()}'
+
+    def clause(self, label, depth):
+        """An IP"""
+        parts = [self.subject_and_verb()]
+        if self.rng.random() < 0.15:
+            parts.append(self.closed('NEG'))
+        if self.rng.random() < 0.3:
+            parts.append(f"(ADVP (ADV {self.vocab.word('ADV')}))")
+        if self.rng.random() < 0.6:
+            parts.append(self.noun_phrase('NP-OB1', depth))
+        for _ in range(self.rng.choice((0, 1, 1, 2))):
+            parts.append(self.prep_phrase(depth))
+        if self.rng.random() < 0.05:
+            parts.append('(CODE {COM:sic})')
+        if depth < 1 and self.rng.random() < 0.2:
+            parts.append(f"(CP-THT (C az) {self.clause('IP-SUB', depth + 1)})")
+        return f"({label} {' '.join(parts)})"
+
+    def tree(self, tree_id):
+        """One flat tree, with its ID"""
+        self.index = 1
+        if self.rng.random() < 0.02:
+            return f'( (CODE <P_{self.rng.randint(1, 500)}>))'
+        clause = self.clause('IP-MAT', 0)
+        if self.rng.random() < 0.2:
+            clause = (f"(IP-MAT {clause[len('(IP-MAT '):-1]} {self.closed('CONJ')} "
+                      f"{self.clause('IP-MAT-2', 1)} (. .))")
+        else:
+            clause = f'{clause[:-1]} (. .))'
+        return f'( {clause} (ID {tree_id}))'
+
+
+def file_sizes(num_trees, num_files):
+    """# of trees in each file, skewed like the PPCHY
+
+    Each file gets at least one tree, so there are no more than num_trees
+    files, and the sizes add up to num_trees.
+    """
+    num_files = min(num_files, num_trees)
+    weights = [1 / rank for rank in range(1, num_files + 1)]
+    total = sum(weights)
+    # one tree each, and the rest by weight
+    rest = num_trees - num_files
+    sizes = [1 + int(rest * weight / total) for weight in weights]
+    if sizes:
+        sizes[0] += num_trees - sum(sizes)
+    return sizes
+
+def file_names(num_files):
+    """The file names, the two special ones first"""
+    names = SPECIAL_FILES[:num_files]
+    for num in range(len(names), num_files):
+        names.append(f'{1600 + (num * 17) % 350}e-synthetic-{num:02d}')
+    return names
+
+def make_corpus(out_dir, num_trees, num_files=NUM_FILES, seed=0, vocab_size=5000):
+    """Write the synthetic .psd files, returning the # of trees and files written
+
+    There are fewer than num_files files if num_trees is smaller.
+
+    Parameters
+    ==========
+    out_dir: Path
+        output directory
+    num_trees: int
+        # of trees in all the files
+    num_files: int
+        # of files
+    seed: int
+        random seed
+    vocab_size: int
+        # of words for each open-class tag
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    maker = TreeMaker(rng, Vocab(rng, vocab_size))
+    sizes = file_sizes(num_trees, num_files)
+    for (name, size) in zip(file_names(len(sizes)), sizes):
+        printer = TreePrinter()
+        printer.start_file(True)
+        with open(out_dir / f'{name}.psd', 'w', encoding='utf-8') as fout:
+            for num in range(size):
+                tree_id = f'{name.upper()},{num // 40 + 1}.{num + 1}'
+                fout.write(printer.format_tree(maker.tree(tree_id)))
+    return (sum(sizes), len(sizes))
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Write a synthetic corpus of .psd files for benchmarking.',
+        add_help=True)
+    parser.add_argument('out_dir', type=pathlib.Path, help='output directory')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f'# of trees, as a multiple of {PPCHY_TREES} (default: 1)')
+    parser.add_argument('--trees', type=int,
+                        help='# of trees, instead of --scale')
+    parser.add_argument('--files', type=int, default=NUM_FILES,
+                        help=f'# of files (default: {NUM_FILES})')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: 0)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    num_trees = args.trees or int(args.scale * PPCHY_TREES)
+    (num_trees, num_files) = make_corpus(args.out_dir, num_trees, args.files, args.seed)
+    logger.info('wrote %d trees in %d files to %s', num_trees, num_files, args.out_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+"""Time the stages of the pipeline on a synthetic corpus
+
+Writes a synthetic corpus with make_synthetic_corpus.py to
+<work_dir> / 'corpus'
+(or uses --corpus-dir), runs the stages on it, each in its own process
+with --force, writing to
+<work_dir> / 'out'
+and writes the results to
+<work_dir> / 'benchmark.json'
+{"trees": ..., "files": ..., "jobs": ...,
+ "stages": {"make_json": {"wall": ..., "cpu": ..., "max_rss_mb": ...,
+                          "trees_per_sec": ...}, ...}}
+The cpu time for a stage includes its worker processes, and max_rss_mb is
+the peak memory of the largest one of its processes.  make_json is run
+with --no-tree-cache, so that it does all the trees every time.  The log of
+each stage is in <work_dir> / 'logs' / STAGE.log.
+
+The results are compared with the ones in --baseline, written by an
+earlier run with --save-baseline.  A stage is slower if its trees/sec is
+down by more than --tolerance, or uses more memory if its max_rss_mb is up
+by more than --tolerance, and then the exit status is 1.  The baseline is
+only comparable on the same machine, with the same --jobs, and with about
+the same # of trees, so there is none checked in.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import pathlib
+import platform
+import subprocess
+from datetime import datetime
+
+from make_synthetic_corpus import PPCHY_TREES, NUM_FILES, make_corpus
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+SRC_DIR = pathlib.Path(__file__).resolve().parent.parent
+BASELINE_FNAME = pathlib.Path(__file__).resolve().parent / 'baseline.json'
+TOLERANCE = 0.2
+
+# stage -> script
+STAGES = {
+    'modify_psd': SRC_DIR / 'modify_psd' / 'modify_psd.py',
+    'prep_psd': SRC_DIR / 'prep_psd' / 'prep_psd.py',
+    'make_json': SRC_DIR / 'mod_leaves' / 'make_json.py',
+    'write_all': SRC_DIR / 'write_files' / 'write_all.py',
+}
+# the stages that take --jobs
+JOBS_STAGES = ('modify_psd', 'prep_psd', 'make_json')
+
+def stage_command(stage, corpus_dir, new_corpus_dir, jobs, profile):
+    """The command line for one stage"""
+    cmd = [sys.executable, str(STAGES[stage])]
+    if stage == 'modify_psd':
+        cmd.append(str(corpus_dir))
+    cmd += [str(new_corpus_dir), '--force']
+    if stage in JOBS_STAGES:
+        cmd += ['--jobs', str(jobs)]
+    if stage == 'make_json':
+        cmd.append('--no-tree-cache')
+    if profile:
+        cmd.append('--profile')
+    return cmd
+
+def run_stage(cmd, log_fname):
+    """Run one stage, returning its wall time, cpu time and max rss in MB
+
+    The stage's output goes to log_fname.  The cpu time and max rss are
+    from wait4, so they include the worker processes.
+    """
+    with open(log_fname, 'w', encoding='utf-8') as log_file:
+        start = time.perf_counter()
+        # pylint: disable=consider-using-with
+        proc = subprocess.Popen(cmd, cwd=SRC_DIR.parent, stdout=log_file,
+                                stderr=subprocess.STDOUT)
+        (_, status, rusage) = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    # ru_maxrss is in KB on Linux
+    return (wall, rusage.ru_utime + rusage.ru_stime, rusage.ru_maxrss / 1024)
+
+def count_trees(corpus_dir):
+    """# of trees in the .psd files, which each start at the start of a line"""
+    num_trees = 0
+    for fname in corpus_dir.glob('./*.psd'):
+        with open(fname, 'r', encoding='utf-8') as fin:
+            num_trees += sum(1 for line in fin if line.startswith('('))
+    return num_trees
+
+def compare(results, baseline, tolerance):
+    """Log the results next to the baseline, returning the stages that got worse"""
+    if baseline['trees'] != results['trees'] or baseline['jobs'] != results['jobs']:
+        logger.warning('baseline has %d trees with --jobs %d, not %d trees with --jobs %d',
+                       baseline['trees'], baseline['jobs'], results['trees'], results['jobs'])
+    worse = []
+    for (stage, result) in results['stages'].items():
+        base = baseline['stages'].get(stage)
+        if base is None:
+            logger.info('%s: not in the baseline', stage)
+            continue
+        speed = result['trees_per_sec'] / base['trees_per_sec']
+        memory = result['max_rss_mb'] / base['max_rss_mb']
+        logger.info('%s: %.0f trees/sec (%+.0f%%), %.0f MB (%+.0f%%)',
+                    stage, result['trees_per_sec'], 100 * (speed - 1),
+                    result['max_rss_mb'], 100 * (memory - 1))
+        if speed < 1 - tolerance or memory > 1 + tolerance:
+            worse.append(stage)
+    return worse
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Time the stages on a synthetic corpus, and compare with a baseline.',
+        add_help=True)
+    parser.add_argument('work_dir', type=pathlib.Path,
+                        help='directory for the corpus, the output and the results')
+    parser.add_argument('--corpus-dir', type=pathlib.Path,
+                        help='use the .psd files in this directory, '
+                        'instead of writing a synthetic corpus')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f'# of trees, as a multiple of {PPCHY_TREES} (default: 1)')
+    parser.add_argument('--trees', type=int,
+                        help='# of trees, instead of --scale')
+    parser.add_argument('--files', type=int, default=NUM_FILES,
+                        help=f'# of files (default: {NUM_FILES})')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: 0)')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+                        help='stages to run (default: all)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='--jobs for modify_psd, prep_psd and make_json (default: 1)')
+    parser.add_argument('--profile', action='store_true',
+                        help='also run the stages with --profile, '
+                        'writing <work_dir>/out/tmp/profile.json')
+    parser.add_argument('--out', type=pathlib.Path,
+                        help='results file (default: <work_dir>/benchmark.json)')
+    parser.add_argument('--baseline', type=pathlib.Path, default=BASELINE_FNAME,
+                        help='results to compare with (default: src/benchmark/baseline.json)')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help='fraction slower or bigger that counts as worse '
+                        f'(default: {TOLERANCE})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write the results to --baseline, instead of comparing')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    if args.corpus_dir:
+        corpus_dir = args.corpus_dir
+        num_trees = count_trees(corpus_dir)
+        num_files = len(list(corpus_dir.glob('./*.psd')))
+    else:
+        corpus_dir = args.work_dir / 'corpus'
+        (num_trees, num_files) = make_corpus(corpus_dir,
+                                             args.trees or int(args.scale * PPCHY_TREES),
+                                             args.files, args.seed)
+    logger.info('%d trees in %d files in %s', num_trees, num_files, corpus_dir)
+
+    new_corpus_dir = args.work_dir / 'out'
+    log_dir = args.work_dir / 'logs'
+    os.makedirs(log_dir, exist_ok=True)
+
+    results = {
+        'started': datetime.now().isoformat(timespec='seconds'),
+        'argv': sys.argv,
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'trees': num_trees,
+        'files': num_files,
+        'jobs': args.jobs,
+        'stages': {}
+    }
+    # in pipeline order, whatever the order given
+    for stage in [stage for stage in STAGES if stage in args.stages]:
+        cmd = stage_command(stage, corpus_dir, new_corpus_dir, args.jobs, args.profile)
+        log_fname = log_dir / f'{stage}.log'
+        try:
+            (wall, cpu, max_rss_mb) = run_stage(cmd, log_fname)
+        except subprocess.CalledProcessError as exc:
+            logger.error('%s failed with status %d, see %s', stage, exc.returncode, log_fname)
+            sys.exit(2)
+        results['stages'][stage] = {'wall': wall, 'cpu': cpu, 'max_rss_mb': max_rss_mb,
+                                    'trees_per_sec': num_trees / wall}
+        logger.info('%s: %.1fs wall, %.1fs cpu, %.0f MB, %.0f trees/sec',
+                    stage, wall, cpu, max_rss_mb, num_trees / wall)
+
+    out_fname = args.out or args.work_dir / 'benchmark.json'
+    for fname in [out_fname] + ([args.baseline] if args.save_baseline else []):
+        with open(fname, 'w', encoding='utf-8') as fout:
+            json.dump(results, fout, indent=4)
+        logger.info('wrote %s', fname)
+    if args.save_baseline:
+        return
+
+    if not args.baseline.exists():
+        logger.info('no baseline %s to compare with', args.baseline)
+        return
+    with open(args.baseline, 'r', encoding='utf-8') as fin:
+        baseline = json.load(fin)
+    worse = compare(results, baseline, args.tolerance)
+    if worse:
+        logger.error('worse than the baseline: %s', ' '.join(worse))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""Spread the trees of a set of files over worker processes
+
+The PPCHY files are very different in size, so handing out whole files
+leaves most of the workers idle while the biggest ones finish.  Instead,
+each file's trees are split into chunks of a fixed number of trees, the
+chunks of all the files are handed out biggest first (so a big chunk is
+not started last), and the results are put back together per file, in
+order.  The time each chunk took is logged, to show how well the work is
+spread.
+
+With a window, the files are read from an iterator and only that many are
+submitted ahead of the one being given back, so the memory used does not
+grow with the corpus.  The chunks are then handed out biggest first
+within each file.
+
+Used by prep_psd.py and make_json.py with --jobs.  With --profile, the
+workers' times are sent back with each chunk (see profiling.py).
+"""
+import time
+import logging
+from collections import deque, namedtuple
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+import profiling
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+CHUNK_TREES = 500
+
+# a range of items from one file
+Chunk = namedtuple('Chunk', 'file_num start end weight')
+
+def make_chunks(files, chunk_size, weight):
+    """Split the items of each file into chunks, biggest first
+
+    Parameters
+    ==========
+    files: list of tuples
+        (name, items, args) for each file
+    chunk_size: int
+        max # of items in a chunk
+    weight: function
+        weight(item) is roughly how long the item takes
+    """
+    chunks = []
+    for (file_num, (_, items, _)) in enumerate(files):
+        for start in range(0, len(items), chunk_size):
+            end = min(start + chunk_size, len(items))
+            chunks.append(Chunk(file_num, start, end,
+                                sum(weight(item) for item in items[start:end])))
+    # sorted is stable, so chunks of the same weight stay in file order
+    return sorted(chunks, key=lambda chunk: -chunk.weight)
+
+def timed_call(func, items, args):
+    """func(items, *args), with the wall and cpu time it took, and the profile times"""
+    (wall, cpu) = (time.perf_counter(), time.process_time())
+    results = func(items, *args)
+    return (results, time.perf_counter() - wall, time.process_time() - cpu,
+            profiling.take())
+
+def submit_chunks(executor, files, func, chunk_size, weight):
+    """Submit the chunks of some files, biggest first
+
+    Returns (name, # of items, [(chunk, future), ...]) for each file.
+    """
+    file2chunks = [(name, len(items), []) for (name, items, _) in files]
+    # a process pool starts the work in the order it is submitted
+    for chunk in make_chunks(files, chunk_size, weight):
+        (_, items, args) = files[chunk.file_num]
+        future = executor.submit(timed_call, func, items[chunk.start:chunk.end], args)
+        file2chunks[chunk.file_num][2].append((chunk, future))
+    return file2chunks
+
+def run_chunks(files, func, jobs, chunk_size=CHUNK_TREES, weight=len,
+               initializer=None, initargs=(), window=None):
+    """Generate (name, results) for each file, in order
+
+    Parameters
+    ==========
+    files: list or iterator of tuples
+        (name, items, args) for each file
+    func: function
+        func(items, *args) returns a list with the result for each item.
+        It is run in the worker processes, so it has to be a module-level
+        function.
+    jobs: int
+        number of worker processes
+    chunk_size: int
+        max # of items sent to a worker at a time
+    weight: function
+        weight(item) is roughly how long the item takes, for handing out
+        the biggest chunks first (default: len)
+    initializer, initargs:
+        run in each worker process when it starts, as for ProcessPoolExecutor
+    window: int
+        if given, the # of files submitted ahead of the one being given
+        back, reading files as needed; otherwise all the files are
+        submitted at the start
+    """
+    files = iter(files)
+    logger.info('chunks of up to %d trees, over %d workers', chunk_size, jobs)
+    start_time = time.perf_counter()
+    busy = 0.0
+    (num_files, num_chunks) = (0, 0)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=profiling.init_worker,
+                             initargs=(profiling.TARGETS, initializer, initargs)) as executor:
+        pending = deque(submit_chunks(executor, list(islice(files, window)),
+                                      func, chunk_size, weight))
+        while pending:
+            (name, num_items, chunk_futures) = pending.popleft()
+            if window is not None:
+                # the next file, so the workers have it before this one is done
+                pending.extend(submit_chunks(executor, list(islice(files, 1)),
+                                             func, chunk_size, weight))
+            results = [None] * num_items
+            for (chunk, future) in sorted(chunk_futures):
+                (chunk_results, wall, cpu, stats) = future.result()
+                profiling.merge(stats)
+                results[chunk.start:chunk.end] = chunk_results
+                busy += wall
+                logger.info('%s trees %d-%d: %.3fs wall, %.3fs cpu',
+                            name, chunk.start, chunk.end - 1, wall, cpu)
+            num_files += 1
+            num_chunks += len(chunk_futures)
+            del chunk_futures
+            yield (name, results)
+
+    elapsed = time.perf_counter() - start_time
+    logger.info('%d chunks from %d files', num_chunks, num_files)
+    if elapsed > 0:
+        logger.info('%.1fs of chunks in %.1fs on %d workers, %.0f%% busy',
+                    busy, elapsed, jobs, 100 * busy / (elapsed * jobs))
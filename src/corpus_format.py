@@ -0,0 +1,254 @@
+"""Compact binary and JSON Lines versions of the json files
+
+make_json.py can write each file as
+<new_corpus_dir> / 'data' / 'bin' / FILE.ppcb
+<new_corpus_dir> / 'data' / 'jsonl' / FILE.jsonl  (one tree dict per line)
+instead of (or as well as) the indented json, and the write_files scripts
+can read them with --format binary or --format jsonl, going through
+the trees one at a time with iter_trees.
+
+The binary file has the same information as the json -
+read_corpus(fname).trees() gives the same list of dicts as json.load on
+the json file - in a fifth of the size.  Reading just the
+columns is many times faster than json.load; building the dicts from
+them is only somewhat faster, so code that reads the corpus over and over
+can use the columns directly.
+
+The format is columnar.  Every string (tree ids, trees and the leaf
+fields) is stored once in a string table, and the tree and leaf columns
+are arrays of int32 indexes into it, together with the leaf start/end
+offsets and a byte of flags for each leaf.  The file is
+    MAGIC
+    string table: int32 # of bytes, then the strings in utf-8, separated by \0
+    tree columns: int32 # of trees, then TREE_COLUMNS
+    leaf columns: int32 # of leaves, then LEAF_COLUMNS, then the flags
+all little-endian.  -1 is used for a missing gloss or pos_extra, which are
+the only fields that can be missing; the others can't be None.
+"""
+import sys
+import json
+from array import array
+from itertools import islice
+
+MAGIC = b'PPCHYB\x01\n'
+SUFFIX = '.ppcb'
+JSONL_SUFFIX = '.jsonl'
+
+# the directory under <new_corpus_dir> / 'data' and the suffix for each
+# format of the make_json.py output
+FORMATS = {
+    'json': ('json', '.json'),
+    'jsonl': ('jsonl', JSONL_SUFFIX),
+    'binary': ('bin', SUFFIX),
+}
+
+# leaves_end is the index after the tree's last leaf in the leaf columns
+TREE_COLUMNS = ('tree_id', 'tree', 'leaves_end')
+LEAF_COLUMNS = ('start', 'end', 'rom', 'pos', 'yid', 'ycode', 'ltype',
+                'gloss', 'pos_extra')
+
+# bits in the leaf flags
+HAS_END = 1
+SPLIT_BEFORE = 2
+SPLIT_AFTER = 4
+
+MISSING = -1
+
+def int_array(values=()):
+    """int32 array"""
+    arr = array('i', values)
+    assert arr.itemsize == 4, 'no 4 byte int array'
+    return arr
+
+def write_array(fout, arr):
+    """Write the array's elements, little-endian"""
+    if sys.byteorder == 'big':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    fout.write(arr.tobytes())
+
+def read_array(data, offset, typecode, length):
+    """Read length elements of an array starting at offset in data
+
+    Returns the array and the offset after it.
+    """
+    arr = array(typecode)
+    end = offset + length * arr.itemsize
+    arr.frombytes(data[offset:end])
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return (arr, end)
+
+def write_corpus(fname, info):
+    """Write the info for one file in the binary format
+
+    Parameters
+    ==========
+    fname: Path
+        output file
+    info: list of dict
+        the dicts for each tree, as written to the json file by make_json.py
+    """
+    strings = {}
+    def intern(text, name):
+        assert text is not None, f'{name} is None'
+        return strings.setdefault(text, len(strings))
+    def intern_optional(text):
+        if text is None:
+            return MISSING
+        return strings.setdefault(text, len(strings))
+
+    tree_cols = {name: int_array() for name in TREE_COLUMNS}
+    leaf_cols = {name: int_array() for name in LEAF_COLUMNS}
+    flags = array('B')
+    for out_dict in info:
+        tree_cols['tree_id'].append(intern(out_dict['tree_id'], 'tree_id'))
+        tree_cols['tree'].append(intern(out_dict['tree'], 'tree'))
+        for leaf in out_dict['leaves']:
+            leaf_cols['start'].append(leaf['start'])
+            leaf_cols['end'].append(leaf.get('end', 0))
+            for name in ('rom', 'pos', 'yid', 'ycode', 'ltype'):
+                leaf_cols[name].append(intern(leaf[name], name))
+            for name in ('gloss', 'pos_extra'):
+                leaf_cols[name].append(intern_optional(leaf.get(name)))
+            flags.append((HAS_END if 'end' in leaf else 0) |
+                         (SPLIT_BEFORE if leaf.get('split_before') else 0) |
+                         (SPLIT_AFTER if leaf.get('split_after') else 0))
+        tree_cols['leaves_end'].append(len(flags))
+
+    for text in strings:
+        assert '\0' not in text, f'\\0 in {text!r}'
+    string_bytes = '\0'.join(strings).encode('utf-8')
+
+    with open(fname, 'wb') as fout:
+        fout.write(MAGIC)
+        write_array(fout, int_array([len(string_bytes)]))
+        fout.write(string_bytes)
+        write_array(fout, int_array([len(tree_cols['tree_id'])]))
+        for name in TREE_COLUMNS:
+            write_array(fout, tree_cols[name])
+        write_array(fout, int_array([len(flags)]))
+        for name in LEAF_COLUMNS:
+            write_array(fout, leaf_cols[name])
+        write_array(fout, flags)
+
+
+def write_info(fname, info):
+    """Write the info for one file, depending on the suffix
+
+    info can be a generator for the .jsonl format, which is written one
+    tree at a time.
+    """
+    if fname.suffix == SUFFIX:
+        write_corpus(fname, info)
+    elif fname.suffix == JSONL_SUFFIX:
+        with open(fname, 'w', encoding='utf-8') as fout:
+            for out_dict in info:
+                fout.write(json.dumps(out_dict, sort_keys=True, ensure_ascii=False) + '\n')
+    else:
+        with open(fname, 'w', encoding='utf-8') as fout:
+            json.dump(info, fout, sort_keys=True,
+                      indent=4, ensure_ascii=False)
+
+def iter_trees(fname):
+    """Generate the dict for each tree in one file of any of the formats
+
+    The .jsonl and binary files are read one tree at a time; a .json file
+    has to be loaded all at once.
+    """
+    if fname.suffix == SUFFIX:
+        yield from read_corpus(fname).iter_trees()
+    elif fname.suffix == JSONL_SUFFIX:
+        with open(fname, 'r', encoding='utf-8') as fin:
+            for line in fin:
+                yield json.loads(line)
+    else:
+        with open(fname, 'r', encoding='utf-8') as fin:
+            yield from json.load(fin)
+
+
+class CorpusFile:
+    """The columns of one binary file
+
+    Parameters
+    ==========
+    fname: Path
+        file written by write_corpus
+
+    The strings are in self.strings, and the columns in the dicts
+    self.tree_cols and self.leaf_cols (and self.flags), for code that
+    only needs some of them.  trees() and iter_trees() give the dicts.
+    """
+    def __init__(self, fname):
+        with open(fname, 'rb') as fin:
+            data = fin.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f'{fname} is not a {SUFFIX} file')
+        offset = len(MAGIC)
+        ((num_bytes,), offset) = read_array(data, offset, 'i', 1)
+        self.strings = data[offset:offset+num_bytes].decode('utf-8').split('\0')
+        offset += num_bytes
+        ((num_trees,), offset) = read_array(data, offset, 'i', 1)
+        self.tree_cols = {}
+        for name in TREE_COLUMNS:
+            (self.tree_cols[name], offset) = read_array(data, offset, 'i', num_trees)
+        ((num_leaves,), offset) = read_array(data, offset, 'i', 1)
+        self.leaf_cols = {}
+        for name in LEAF_COLUMNS:
+            (self.leaf_cols[name], offset) = read_array(data, offset, 'i', num_leaves)
+        (self.flags, offset) = read_array(data, offset, 'B', num_leaves)
+        if offset != len(data):
+            raise ValueError(f'{fname} has {len(data) - offset} extra bytes')
+
+    def __len__(self):
+        return len(self.tree_cols['tree_id'])
+
+    def iter_leaves(self):
+        """Generate the dicts for all the leaves, in order"""
+        strings = self.strings
+        cols = self.leaf_cols
+        for (num, num_end, rom, pos, yid, ycode, ltype, gloss, pos_extra, flags) in zip(
+                *[cols[name] for name in LEAF_COLUMNS], self.flags):
+            leaf = {
+                'start': num,
+                'rom': strings[rom],
+                'pos': strings[pos],
+                'yid': strings[yid],
+                'ycode': strings[ycode],
+                'ltype': strings[ltype]
+            }
+            if flags:
+                if flags & HAS_END:
+                    leaf['end'] = num_end
+                if flags & SPLIT_BEFORE:
+                    leaf['split_before'] = True
+                if flags & SPLIT_AFTER:
+                    leaf['split_after'] = True
+            if gloss != MISSING:
+                leaf['gloss'] = strings[gloss]
+            if pos_extra != MISSING:
+                leaf['pos_extra'] = strings[pos_extra]
+            yield leaf
+
+    def iter_trees(self):
+        """Generate the dict for each tree, the same as in the json file"""
+        strings = self.strings
+        leaves = self.iter_leaves()
+        leaves_start = 0
+        for (tree_id, tree, leaves_end) in zip(*[self.tree_cols[name]
+                                                 for name in TREE_COLUMNS]):
+            yield {
+                'tree_id': strings[tree_id],
+                'tree': strings[tree],
+                'leaves': list(islice(leaves, leaves_end - leaves_start))
+            }
+            leaves_start = leaves_end
+
+    def trees(self):
+        """List of the dicts for all the trees"""
+        return list(self.iter_trees())
+
+
+def read_corpus(fname):
+    """Read a binary file, returning a CorpusFile"""
+    return CorpusFile(fname)
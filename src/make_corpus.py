@@ -0,0 +1,248 @@
+"""Run modify_psd, prep_psd and make_json in one process
+
+Reads the PPCHY .psd files and writes
+<new_corpus_dir> / 'data' / 'json' / FILE.json
+(and/or data/jsonl/FILE.jsonl or data/bin/FILE.ppcb with --format, see
+corpus_format.py)
+
+the same as running modify_psd.py, prep_psd.py and make_json.py one after
+the other, but each tree goes through make_changes, prep_psd_utils.process
+and make_json.iter_process_file in memory, without writing and reading back
+the intermediate files.
+
+With --keep-tmp, the intermediate files are still written to
+<new_corpus_dir> / 'tmp' / 'mod_psd' / FILE.psd
+<new_corpus_dir> / 'tmp' / 'prep_psd' / FILE.txt
+for debugging.  They are recorded in those directories' manifests as
+modify_psd.py and prep_psd.py would, and a file is only skipped if they
+are up to date too, so the stage scripts can be run on them afterwards.
+
+Files whose input and rule files are unchanged since the last run are
+skipped (see manifest.py), unless --force is given.  Trees already
+processed in an earlier run are taken from the tree cache (see
+mod_leaves/tree_cache.py).
+
+With --profile, the times for the parts of all three stages are added to
+the profile report (see profiling.py), as the make_corpus stage.
+"""
+import os
+import sys
+import logging
+import argparse
+import pathlib
+from tqdm import tqdm
+
+SRC_DIR = pathlib.Path(__file__).resolve().parent
+for sub_dir in ('modify_psd', 'prep_psd', 'mod_leaves'):
+    sys.path.insert(0, str(SRC_DIR / sub_dir))
+
+# pylint: disable=wrong-import-position
+from yiddishycode.translit import Transliterator
+from modify_psd import (iter_file_trees, PROFILE_TARGETS as MODIFY_PSD_TARGETS,
+                        STAGE_DEPS as MODIFY_PSD_DEPS)
+from corpus_mods import make_changes
+from prep_psd_utils import process
+from prep_psd import STAGE_DEPS as PREP_PSD_DEPS
+from make_json import iter_process_file, PROFILE_TARGETS as MAKE_JSON_TARGETS
+from yid_leaf import YidLeaf
+from tree_cache import TreeCache
+from rom_table import RomTable
+from rom2uni.convert_rom2uni import set_cache_dir
+from manifest import Manifest, stage_files
+from corpus_format import FORMATS, write_info
+import profiling
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# the three stages' code and rule files, and this script, which has its
+# own glue between them (like which trees get do_yiddish_script_split)
+STAGE_DEPS = [fname
+              for sub_dir in ('modify_psd', 'prep_psd', 'mod_leaves')
+              for fname in stage_files(SRC_DIR / sub_dir)] + [SRC_DIR / 'corpus_format.py',
+                                                              pathlib.Path(__file__).resolve()]
+
+# the functions timed with --profile: the ones called here, and the ones
+# the stages call (those that the stage scripts call themselves are
+# wrapped too, but not used)
+PROFILE_TARGETS = [
+    (__name__, 'iter_file_trees', 'read_file'),
+    (__name__, 'make_changes', 'make_changes'),
+    (__name__, 'process', 'prep_psd_process'),
+    ('prep_psd_utils', 'PPCTree', 'ppctree_parse'),
+    (__name__, 'write_info', 'write_output'),
+] + MODIFY_PSD_TARGETS + MAKE_JSON_TARGETS
+
+def tee_lines(items, fout, func):
+    """Pass items through, writing func(item) to fout if fout is not None"""
+    for item in items:
+        if fout is not None:
+            fout.write(func(item) + '\n')
+        yield item
+
+def make_file(fname, new_corpus_dir, translit, keep_tmp, cache, rom_table=None,
+              verify=False, formats=('json',)):
+    """Do all three stages for one .psd file
+
+    Parameters
+    ==========
+    fname: Path
+        input psd file
+    new_corpus_dir: Path
+        output root directory
+    translit: Transliterator
+        for converting yiddish script to ycode
+    keep_tmp: boolean
+        if true, also write the mod_psd and prep_psd files
+    cache: TreeCache
+        cache of processed trees, or None
+    rom_table: RomTable
+        precomputed yid/ycode forms, or None
+    verify: boolean
+        if true, check each prepped tree by converting it to a PPCTree and back
+    formats: list of str
+        formats to write the result in, keys of corpus_format.FORMATS
+    """
+    mod_fout = None
+    prep_fout = None
+    if keep_tmp:
+        mod_fout = open(new_corpus_dir / 'tmp' / 'mod_psd' / fname.name,
+                        'w', encoding='utf-8')
+        prep_fout = open(new_corpus_dir / 'tmp' / 'prep_psd' / f'{fname.stem}.txt',
+                         'w', encoding='utf-8')
+    try:
+        # modify_psd.py
+        # changes only apply to 1910e-grine-felder.psd and
+        # 1947e-royte-pomerantsen.psd
+        trees = iter_file_trees(fname)
+        if fname.stem.startswith('1910') or fname.stem.startswith('1947'):
+            trees = (make_changes(tree) for tree in trees)
+        trees = tee_lines(trees, mod_fout, lambda tree: tree)
+
+        # prep_psd.py
+        # with verify, the tree is parsed with YidLeaf leaves once here
+        # and passed on to make_json
+        info_lst = (process(tree, verify, YidLeaf) for tree in trees)
+        info_lst = tee_lines(info_lst, prep_fout,
+                             lambda info: f'{info.tree_id}\t{info.tree_str}')
+        lines = ((info.tree_id, info.tree_str, info.ppc_tree) for info in info_lst)
+
+        # make_json.py
+        do_yiddish_script_split = fname.stem.startswith('1910') or fname.stem.startswith('1947')
+        info = iter_process_file(lines, translit, do_yiddish_script_split, cache,
+                                 rom_table)
+        # only jsonl can be written as the trees are done, and not with
+        # --profile, so the writing time is just for the writing
+        if list(formats) != ['jsonl'] or profiling.STATS is not None:
+            info = list(info)
+        for fmt in formats:
+            (sub_dir, suffix) = FORMATS[fmt]
+            write_info(new_corpus_dir / 'data' / sub_dir / f'{fname.stem}{suffix}', info)
+    finally:
+        if keep_tmp:
+            mod_fout.close()
+            prep_fout.close()
+
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Convert .psd files to the json files in one pass.',
+        add_help=True)
+    parser.add_argument('corpus_dir', type=pathlib.Path, help='corpus psd directory')
+    parser.add_argument('new_corpus_dir', type=pathlib.Path, help='output root directory')
+    parser.add_argument('--keep-tmp', action='store_true',
+                        help='also write the tmp/mod_psd and tmp/prep_psd files')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--no-tree-cache', action='store_true',
+                        help='do not use the tmp/tree_cache.sqlite cache of processed trees')
+    parser.add_argument('--rom-table', type=pathlib.Path,
+                        help='table of yid/ycode forms made by mod_leaves/make_rom_table.py')
+    parser.add_argument('--verify', action='store_true',
+                        help='check each prepped tree by converting it to a PPCTree and back')
+    parser.add_argument('--format', nargs='+', choices=list(FORMATS), default=['json'],
+                        help='write data/json/FILE.json, data/jsonl/FILE.jsonl and/or '
+                        'data/bin/FILE.ppcb (default: json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    fnames = sorted(args.corpus_dir.glob('./*.psd'))
+
+    formats = list(dict.fromkeys(args.format))
+    out_dirs = [args.new_corpus_dir / 'data' / FORMATS[fmt][0] for fmt in formats]
+    for out_dir in out_dirs:
+        os.makedirs(out_dir, exist_ok=True)
+    mod_dir = args.new_corpus_dir / 'tmp' / 'mod_psd'
+    prep_dir = args.new_corpus_dir / 'tmp' / 'prep_psd'
+    if args.keep_tmp:
+        os.makedirs(mod_dir, exist_ok=True)
+        os.makedirs(prep_dir, exist_ok=True)
+
+    # the parsed rom2uni lookups are kept in tmp
+    set_cache_dir(args.new_corpus_dir / 'tmp')
+    translit = Transliterator()
+    rom_table = RomTable(translit, args.rom_table)
+
+    cache = None
+    if not args.no_tree_cache:
+        os.makedirs(args.new_corpus_dir / 'tmp', exist_ok=True)
+        cache = TreeCache(args.new_corpus_dir / 'tmp' / 'tree_cache.sqlite')
+
+    manifests = [Manifest(out_dir, STAGE_DEPS) for out_dir in out_dirs]
+    # the stage scripts' manifests for the tmp files, with --keep-tmp
+    tmp_manifests = []
+    if args.keep_tmp:
+        tmp_manifests = [Manifest(mod_dir, MODIFY_PSD_DEPS), Manifest(prep_dir, PREP_PSD_DEPS)]
+
+    def tmp_current(fname):
+        (mod_manifest, prep_manifest) = tmp_manifests
+        mod_fname = mod_dir / fname.name
+        return (mod_manifest.is_current(mod_fname, mod_manifest.key([fname])) and
+                prep_manifest.is_current(prep_dir / f'{fname.stem}.txt',
+                                         prep_manifest.key([mod_fname])))
+
+    def record_tmp(fname):
+        (mod_manifest, prep_manifest) = tmp_manifests
+        mod_fname = mod_dir / fname.name
+        mod_manifest.record(mod_fname, mod_manifest.key([fname]))
+        prep_manifest.record(prep_dir / f'{fname.stem}.txt', prep_manifest.key([mod_fname]))
+
+    try:
+        for fname in tqdm(fnames):
+            out_fnames = [out_dir / f'{fname.stem}{FORMATS[fmt][1]}'
+                          for (fmt, out_dir) in zip(formats, out_dirs)]
+            key = manifests[0].key([fname])
+            if (not args.force and
+                    all(manifest.is_current(out_fname, key)
+                        for (manifest, out_fname) in zip(manifests, out_fnames)) and
+                    (not args.keep_tmp or tmp_current(fname))):
+                continue
+            make_file(fname, args.new_corpus_dir, translit, args.keep_tmp, cache,
+                      rom_table, args.verify, formats)
+            for (manifest, out_fname) in zip(manifests, out_fnames):
+                manifest.record(out_fname, key)
+            if args.keep_tmp:
+                record_tmp(fname)
+            if cache is not None:
+                cache.commit()
+    finally:
+        for manifest in manifests + tmp_manifests:
+            manifest.save()
+        if cache is not None:
+            logger.info('tree cache: %d hits, %d misses', cache.hits, cache.misses)
+            cache.close()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'make_corpus')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Content-hash manifests for skipping files that don't need to be redone
+
+Each output directory (tmp/mod_psd, tmp/prep_psd, data/json, data/pos, ...)
+gets a .manifest file, which records for each output file a hash of the
+input file(s) it was made from, together with the files the stage depends
+on - the rule and lookup files, and the code itself.  If that hash is the
+same the next time the stage is run, the output file is up to date and is
+skipped.
+
+The manifest is named .manifest so that it is not picked up by the
+*.psd, *.txt and *.json globs of the next stage.
+"""
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = '.manifest'
+
+def hash_file(fname):
+    """Return the sha256 hex digest of the contents of fname"""
+    sha = hashlib.sha256()
+    with open(fname, 'rb') as fin:
+        for chunk in iter(lambda: fin.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def stage_files(stage_dir, patterns=('*.py', '*.txt')):
+    """List the code and rule files under stage_dir, for the stage dependencies"""
+    fnames = []
+    for pattern in patterns:
+        fnames.extend(fname for fname in stage_dir.rglob(pattern)
+                      if '__pycache__' not in fname.parts)
+    return sorted(fnames)
+
+
+class Manifest:
+    """Hashes of the inputs for the files in one output directory
+
+    Parameters
+    ==========
+    out_dir: Path
+        output directory for the stage
+    dep_fnames: list of Path
+        rule/lookup/code files that all the output files depend on
+    """
+    def __init__(self, out_dir, dep_fnames):
+        self.fname = out_dir / MANIFEST_NAME
+        sha = hashlib.sha256()
+        for dep_fname in sorted(dep_fnames):
+            sha.update(f'{dep_fname.name}\t{hash_file(dep_fname)}\n'.encode('utf-8'))
+        self.deps_hash = sha.hexdigest()
+        self.entries = self.read_entries()
+        # the entries recorded since the manifest was read
+        self.recorded = {}
+
+    def read_entries(self):
+        """Read the entries in the manifest file, if any"""
+        if not self.fname.exists():
+            return {}
+        with open(self.fname, 'r', encoding='utf-8') as fin:
+            return json.load(fin)
+
+    def key(self, in_fnames):
+        """Hash of the input files and the stage dependencies"""
+        return self.key_for_hashes([(in_fname.name, hash_file(in_fname))
+                                    for in_fname in in_fnames])
+
+    def key_for_hashes(self, name_hashes):
+        """Same as key, for inputs given as (file name, hash_file digest)
+
+        For an input that is made in the same pass as the output, so its
+        hash is known without reading it back.
+        """
+        sha = hashlib.sha256(self.deps_hash.encode('utf-8'))
+        for (name, digest) in name_hashes:
+            sha.update(f'{name}\t{digest}\n'.encode('utf-8'))
+        return sha.hexdigest()
+
+    def is_current(self, out_fname, key):
+        """Check if out_fname exists and was made from the same inputs"""
+        return out_fname.exists() and self.entries.get(out_fname.name) == key
+
+    def record(self, out_fname, key):
+        """Note that out_fname has been made from the inputs with this key"""
+        self.entries[out_fname.name] = key
+        self.recorded[out_fname.name] = key
+
+    def save(self):
+        """Write the manifest, replacing any previous one
+
+        The entries recorded here are added to the ones in the file as it
+        is now, so that other Manifest objects for the same directory
+        (like the two count scripts' in data/misc) don't lose theirs.
+        """
+        self.entries = self.read_entries()
+        self.entries.update(self.recorded)
+        tmp_fname = self.fname.with_name(self.fname.name + '.tmp')
+        with open(tmp_fname, 'w', encoding='utf-8') as fout:
+            json.dump(self.entries, fout, sort_keys=True, indent=4)
+        os.replace(tmp_fname, self.fname)
@@ -9,14 +9,41 @@ The .json is a list of dicts for each tree, where each dict has:
 from the original tree, as modified by by prep_psd.
 'leaves': a listing of all the leaves for the tree, with both the romanized
 and Yiddish script forms
+
+Files whose input and rule files are unchanged since the last run are
+skipped (see manifest.py), unless --force is given.  Within a file that
+has changed, trees that were already processed in an earlier run are taken
+from <new_corpus_dir>/ 'tmp' / 'tree_cache.sqlite' (see tree_cache.py).
+
+With --rom-table, the Yiddish script and ycode forms are looked up in a
+table made by make_rom_table.py instead of converted for each leaf.
+
+With --format, the same info can also or instead be written to
+<new_corpus_dir>/ 'data' / 'jsonl' / FILE.jsonl, one tree per line
+<new_corpus_dir>/ 'data' / 'bin' / FILE.ppcb, in a compact binary format
+(see corpus_format.py).  With just jsonl, each tree is written as soon as
+it is done.
+
+With --jobs N, the trees are done by N worker processes, each of which
+reads the lookup tables and makes its Transliterator once.  The trees of
+each file are sent to the workers in chunks of --chunk-trees, biggest
+first, so a big file is spread over all of them, and put back together in
+order, so the output is the same as with one process (see
+chunk_scheduler.py).
+
+With --profile, the times for reading the files, PPCTree parsing, copying
+and merging the leaves, convert, yiddish2ycode, split_word and writing the
+output are added to the profile report (see profiling.py).  The jsonl
+output is then not written as the trees are done, so that the writing
+time doesn't include the time to do the trees.
 """
 import os
+import sys
 import logging
 import argparse
 import pathlib
-import copy
-import json
-from tqdm import trange
+from collections import deque
+from tqdm import tqdm
 from ppctree.tree.ppc_tree import PPCTree
 from yiddishycode.translit import Transliterator
 from yid_leaf import YidLeaf
@@ -24,9 +51,39 @@ from transform_trees_merge import merge_leaves
 from make_json_utils import (add_rom_field,
                              make_yiddish_script_forms,
                              put_rom_leaves_back_into_tree)
+from tree_cache import TreeCache
+from rom_table import RomTable
+from rom2uni.convert_rom2uni import (MEMO_SIZE, set_memo_size, memo_info, load_lookups,
+                                     set_cache_dir)
+from split_word.split_word import load_splits
+
+SRC_DIR = pathlib.Path(__file__).resolve().parent.parent
+sys.path.append(str(SRC_DIR))
+# pylint: disable=wrong-import-position
+from manifest import Manifest, stage_files
+from corpus_format import FORMATS, write_info
+from chunk_scheduler import CHUNK_TREES, run_chunks
+import profiling
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# the merge code, split patterns and rom2uni lookup files, and the
+# output format code
+STAGE_DEPS = (stage_files(pathlib.Path(__file__).resolve().parent) +
+              [SRC_DIR / 'corpus_format.py'])
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'iter_lines', 'read_file'),
+    (__name__, 'PPCTree', 'ppctree_parse'),
+    ('yid_leaf', 'YidLeaf.detached_copy', 'detached_copy'),
+    (__name__, 'merge_leaves', 'merge_leaves'),
+    ('rom_table', 'convert', 'convert'),
+    ('yiddishycode.translit', 'Transliterator.yiddish2ycode', 'yiddish2ycode'),
+    ('make_json_utils', 'split_word', 'split_word'),
+    (__name__, 'write_info', 'write_output'),
+]
+
 def make_leaves_dict_lst(yid_leaves):
     """Make list of leaf info
 
@@ -87,8 +144,21 @@ def make_leaves_dict_lst(yid_leaves):
     return lst
 
 
-def process_file(lines, translit, do_yiddish_script_split):
-    """Convert the json info for one file.
+def iter_lines(fname):
+    """Generate the [tree_id, tree] for each line of a prep_psd file"""
+    with open(fname, 'r', encoding='utf-8') as fin:
+        for line in fin:
+            yield line.rstrip('\n').split('\t')
+
+def process_file(lines, translit, do_yiddish_script_split, cache=None,
+                 rom_table=None):
+    """List of the dicts from iter_process_file"""
+    return list(iter_process_file(lines, translit, do_yiddish_script_split,
+                                  cache, rom_table))
+
+def iter_process_file(lines, translit, do_yiddish_script_split, cache=None,
+                      rom_table=None):
+    """Convert the json info for one file, generating the dict for each tree.
 
     for each tree that has an id:
     (1) convert tree representation to PPCTree
@@ -117,7 +187,10 @@ def process_file(lines, translit, do_yiddish_script_split):
     Parameters
     =========
     lines: list of pairs
-       Each pair (tree_id, tree)  where tree_id can be 'notreeid'
+       Each pair (tree_id, tree)  where tree_id can be 'notreeid'.
+       There can also be a third item, the tree as a PPCTree with YidLeaf
+       leaves already checked against tree, to use instead of parsing
+       the tree again.
     translit: Transliterator
         for converting yiddish script to ycode
     do_yiddish_script_split: boolean
@@ -129,32 +202,50 @@ def process_file(lines, translit, do_yiddish_script_split):
         has the non-final form of "f", but if "oyf" and "n" are converted
         to Yiddish script separatel, then "oyf" will have the incorrect final
         form of "f".  For now only worrying about this for 1910 and 1947.
+    cache: TreeCache
+        if not None, a tree found in the cache isn't processed again,
+        and new trees are added to it
+    rom_table: RomTable
+        precomputed yid/ycode forms, or None to convert everything.
+        The ycode forms converted for one tree are kept for the rest.
     """
-    info = []
-    for (tree_id, tree_str) in lines:
+    if rom_table is None:
+        rom_table = RomTable(translit)
+    for line in lines:
+        (tree_id, tree_str) = line[:2]
+        # already parsed and checked by prep_psd_utils.process
+        ppc_tree = line[2] if len(line) > 2 else None
         if tree_id == 'notreeid':
             out_dict = {
                 'tree_id': tree_id,
                 'tree': tree_str,
                 'leaves': []
             }
-            info.append(out_dict)
+            yield out_dict
             continue
 
+        if cache is not None:
+            out_dict = cache.get(tree_id, tree_str, do_yiddish_script_split)
+            if out_dict is not None:
+                yield out_dict
+                continue
+
         # (1)
-        ppc_tree = PPCTree(tree_str, term_class=YidLeaf)
-        mystr = ppc_tree.mystr()
-        # just a check that conversion back from tree is the same
-        assert mystr == tree_str, \
-            f'weirdness with tree conversion\ntree_str={tree_str}\nppc_tree={mystr}'
+        if ppc_tree is None:
+            ppc_tree = PPCTree(tree_str, term_class=YidLeaf)
+            mystr = ppc_tree.mystr()
+            # just a check that conversion back from tree is the same
+            assert mystr == tree_str, \
+                f'weirdness with tree conversion\ntree_str={tree_str}\nppc_tree={mystr}'
 
         # (2)
         yid_leaves_orig = ppc_tree.nonempty_leaf_nodes
         # The merge_leaves function following is a destructive operation
         # on the list of leaves. This will modify the ppc_tree which
         # is also used below to put the leaves back in
-        # So the leaf operations is done on a copy.
-        yid_leaves = copy.deepcopy(yid_leaves_orig)
+        # So the leaf operations is done on a copy, without the
+        # links back into the tree.
+        yid_leaves = [leaf.detached_copy() for leaf in yid_leaves_orig]
 
         # (3)
         add_rom_field(yid_leaves)
@@ -168,7 +259,8 @@ def process_file(lines, translit, do_yiddish_script_split):
         # (5)
         # get actual yiddish script.  leaves will now have a
         # .yid and .ycode field
-        make_yiddish_script_forms(yid_leaves, translit, do_yiddish_script_split)
+        make_yiddish_script_forms(yid_leaves, translit, do_yiddish_script_split,
+                                  rom_table)
 
         # (6)
         leaves_dict_lst = make_leaves_dict_lst(yid_leaves)
@@ -182,9 +274,89 @@ def process_file(lines, translit, do_yiddish_script_split):
             'tree': tree,
             'leaves': leaves_dict_lst
             }
-        info.append(out_dict)
-    return info
+        if cache is not None:
+            cache.put(tree_str, do_yiddish_script_split, out_dict)
+        yield out_dict
+
+
+
+TRANSLIT = None
+ROM_TABLE = None
+
+def init_worker(rom_table_fname, memo_size, cache_dir):
+    """Load the tables and make the Transliterator once per worker process"""
+    global TRANSLIT, ROM_TABLE  # pylint: disable=global-statement
+    set_memo_size(memo_size)
+    set_cache_dir(cache_dir)
+    load_lookups()
+    load_splits()
+    TRANSLIT = Transliterator()
+    ROM_TABLE = RomTable(TRANSLIT, rom_table_fname)
 
+def process_chunk(lines, do_yiddish_script_split):
+    """process_file for some of the trees of a file, in a worker process"""
+    return process_file(lines, TRANSLIT, do_yiddish_script_split, None, ROM_TABLE)
+
+def iter_process_files_parallel(fnames, jobs, cache, rom_table_fname, memo_size, cache_dir,
+                                chunk_trees=CHUNK_TREES):
+    """Generate (fname, info) for each file, with the trees done by worker processes
+
+    Trees found in the cache are taken from it here, and the rest are
+    handed out to the workers in chunks by chunk_scheduler.run_chunks.
+    The files are read as the workers get to them, a few files ahead of
+    the one being given back, so the memory used does not grow with the
+    # of files.
+
+    Parameters
+    ==========
+    fnames: list of Path
+        the prep_psd files to do
+    jobs: int
+        number of worker processes
+    cache: TreeCache
+        cache of processed trees, or None
+    rom_table_fname: Path
+        table of yid/ycode forms, or None
+    memo_size: int
+        size of the memo for convert in each worker
+    cache_dir: Path
+        where the rom2uni lookup tables are kept, for set_cache_dir
+    chunk_trees: int
+        max # of trees sent to a worker at a time
+    """
+    # the files read by iter_files and not given back yet
+    file_infos = deque()
+
+    def iter_files():
+        for fname in fnames:
+            do_yiddish_script_split = (fname.stem.startswith('1910') or
+                                       fname.stem.startswith('1947'))
+            info = []
+            (todo, todo_lines) = ([], [])
+            for (i, (tree_id, tree_str)) in enumerate(iter_lines(fname)):
+                info.append(None)
+                if cache is not None and tree_id != 'notreeid':
+                    info[i] = cache.get(tree_id, tree_str, do_yiddish_script_split)
+                    if info[i] is not None:
+                        continue
+                todo.append(i)
+                todo_lines.append((tree_id, tree_str))
+            file_infos.append((fname, info, todo, todo_lines, do_yiddish_script_split))
+            yield (fname.stem, todo_lines, (do_yiddish_script_split,))
+
+    # with a file for each worker ahead, the workers are kept busy even
+    # when the files are smaller than a chunk
+    for (_, results) in run_chunks(iter_files(), process_chunk, jobs, chunk_trees,
+                                   weight=lambda line: len(line[1]),
+                                   initializer=init_worker,
+                                   initargs=(rom_table_fname, memo_size, cache_dir),
+                                   window=jobs + 1):
+        (fname, info, todo, todo_lines, do_yiddish_script_split) = file_infos.popleft()
+        for (i, line, out_dict) in zip(todo, todo_lines, results):
+            info[i] = out_dict
+            if cache is not None and line[0] != 'notreeid':
+                cache.put(line[1], do_yiddish_script_split, out_dict)
+        yield (fname, info)
 
 
 def main():
@@ -193,33 +365,110 @@ def main():
         description='Convert .psd files to form for futher processing.',
         add_help=True)
     parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--no-tree-cache', action='store_true',
+                        help='do not use the tmp/tree_cache.sqlite cache of processed trees')
+    parser.add_argument('--convert-memo-size', type=int, default=MEMO_SIZE,
+                        help=f'max # of (rom, pos) conversions to remember (default: {MEMO_SIZE})')
+    parser.add_argument('--rom-table', type=pathlib.Path,
+                        help='table of yid/ycode forms made by make_rom_table.py')
+    parser.add_argument('--format', nargs='+', choices=list(FORMATS), default=['json'],
+                        help='write data/json/FILE.json, data/jsonl/FILE.jsonl and/or '
+                        'data/bin/FILE.ppcb (default: json)')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes (default: 1, no workers)')
+    parser.add_argument('--chunk-trees', type=int, default=CHUNK_TREES,
+                        help=f'max # of trees sent to a worker at a time (default: {CHUNK_TREES})')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     args = parser.parse_args()
 
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
-    tmp2_dir = args.new_corpus_dir / 'tmp' / 'prep_psd'
-    json_dir = args.new_corpus_dir / 'data' / 'json'
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    tmp_dir = args.new_corpus_dir / 'tmp'
+    tmp2_dir = tmp_dir / 'prep_psd'
+    formats = list(dict.fromkeys(args.format))
+    out_dirs = [args.new_corpus_dir / 'data' / FORMATS[fmt][0] for fmt in formats]
 
-    os.makedirs(json_dir, exist_ok=True)
+    for out_dir in out_dirs:
+        os.makedirs(out_dir, exist_ok=True)
 
-    translit = Transliterator()
+    # the parsed rom2uni lookups are kept in tmp
+    set_cache_dir(tmp_dir)
+    if args.jobs <= 1:
+        translit = Transliterator()
+        set_memo_size(args.convert_memo_size)
+        rom_table = RomTable(translit, args.rom_table)
+
+    cache = None
+    if not args.no_tree_cache:
+        os.makedirs(args.new_corpus_dir / 'tmp', exist_ok=True)
+        cache = TreeCache(args.new_corpus_dir / 'tmp' / 'tree_cache.sqlite')
 
     fnames = list(tmp2_dir.glob('./*.txt'))
 
-    for fnum in trange(len(fnames)):
-        fname = fnames[fnum]
-        with open(fname, 'r', encoding='utf-8') as fin:
-            lines = fin.readlines()
-        lines = [line.rstrip('\n').split('\t') for line in lines]
-
-        do_yiddish_script_split = fname.stem.startswith('1910') or fname.stem.startswith('1947')
-        info = process_file(lines, translit, do_yiddish_script_split)
-        with open(json_dir / f'{fname.stem}.json',
-                  'w', encoding='utf-8') as fout:
-            json.dump(info, fout, sort_keys=True,
-                      indent=4, ensure_ascii=False)
+    manifests = [Manifest(out_dir, STAGE_DEPS) for out_dir in out_dirs]
+
+    def out_fnames_for(fname):
+        return [out_dir / f'{fname.stem}{FORMATS[fmt][1]}'
+                for (fmt, out_dir) in zip(formats, out_dirs)]
+
+    # the files to redo, with their manifest keys
+    todo = []
+    for fname in fnames:
+        key = manifests[0].key([fname])
+        if not args.force and all(manifest.is_current(out_fname, key)
+                                  for (manifest, out_fname) in zip(manifests,
+                                                                   out_fnames_for(fname))):
+            continue
+        todo.append((fname, key))
+
+    def finish_file(fname, key):
+        for (manifest, out_fname) in zip(manifests, out_fnames_for(fname)):
+            manifest.record(out_fname, key)
+        if cache is not None:
+            cache.commit()
+
+    try:
+        if args.jobs > 1:
+            fname2key = dict(todo)
+            for (fname, info) in tqdm(iter_process_files_parallel(
+                    list(fname2key), args.jobs, cache, args.rom_table,
+                    args.convert_memo_size, tmp_dir, args.chunk_trees), total=len(todo)):
+                for out_fname in out_fnames_for(fname):
+                    write_info(out_fname, info)
+                finish_file(fname, fname2key[fname])
+        else:
+            for (fname, key) in tqdm(todo):
+                do_yiddish_script_split = (fname.stem.startswith('1910') or
+                                           fname.stem.startswith('1947'))
+                info = iter_process_file(iter_lines(fname), translit,
+                                         do_yiddish_script_split, cache, rom_table)
+                # only jsonl can be written as the trees are done
+                if formats != ['jsonl'] or args.profile is not None:
+                    info = list(info)
+                for out_fname in out_fnames_for(fname):
+                    write_info(out_fname, info)
+                finish_file(fname, key)
+    finally:
+        for manifest in manifests:
+            manifest.save()
+        if cache is not None:
+            logger.info('tree cache: %d hits, %d misses', cache.hits, cache.misses)
+            cache.close()
+        if args.jobs <= 1:
+            memo = memo_info()
+            logger.info('convert memo: %d hits, %d misses', memo.hits, memo.misses)
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'make_json')
 
 if __name__ == '__main__':
     main()
@@ -1,5 +1,5 @@
-from rom2uni.convert_rom2uni import convert
 from split_word.split_word import split_word
+from rom_table import RomTable
 
 def add_rom_field(leaves):
     """set the rom(anization) for each leaf
@@ -20,7 +20,8 @@ def add_rom_field(leaves):
             rom = '!'
         leaf.rom = rom
 
-def make_yiddish_script_forms(leaves, translit, do_yiddish_script_split):
+def make_yiddish_script_forms(leaves, translit, do_yiddish_script_split,
+                              rom_table=None):
     """Convert romanization to Yiddish script for all leaves
     Parameters
     ==========
@@ -28,11 +29,21 @@ def make_yiddish_script_forms(leaves, translit, do_yiddish_script_split):
         all the nonempty terminals of the tree
     translit: Transliterator
         for converting yiddish script to ycode
+    rom_table: RomTable
+        precomputed yid/ycode forms. If None, they are all converted
+        with convert and translit.
+
+    The yid forms are set first, and then the ycode forms for all the
+    leaves and children are done in one batch with rom_table.ycodes.
     """
+    if rom_table is None:
+        rom_table = RomTable(translit)
+    # all the leaves and children, to set the ycode for at the end
+    yid_nodes = []
     for leaf in leaves:
         assert '~' not in leaf.rom, 'has ~'
-        leaf.yid = convert(leaf.rom, leaf.pos)
-        leaf.ycode = translit.yiddish2ycode(leaf.yid)
+        leaf.yid = rom_table.yid(leaf.rom, leaf.pos)
+        yid_nodes.append(leaf)
 
         expected_num_children = len(leaf.pos.split('~'))
         # if ~, then result from split is list of one
@@ -45,8 +56,8 @@ def make_yiddish_script_forms(leaves, translit, do_yiddish_script_split):
                 assert '~' not in child.rom, 'has ~'
             if not do_yiddish_script_split:
                 for child in leaf.children:
-                    child.yid = convert(child.rom, child.pos)
-                    child.ycode = translit.yiddish2ycode(child.yid)
+                    child.yid = rom_table.yid(child.rom, child.pos)
+                    yid_nodes.append(child)
             else:
                 split_parts = split_word(leaf.pos, leaf.yid)
                 assert split_parts is not None, \
@@ -64,8 +75,11 @@ def make_yiddish_script_forms(leaves, translit, do_yiddish_script_split):
                 #    print(f'diff in split_parts\t{leaf.pos}\t{leaf.rom}\t{split_parts_str}\t{yid2_parts_str}')
                 for (split_part, child) in zip(split_parts, leaf.children):
                     child.yid = split_part
-                    child.ycode = translit.yiddish2ycode(child.yid)
+                    yid_nodes.append(child)
 
+    ycodes = rom_table.ycodes([node.yid for node in yid_nodes])
+    for (node, ycode) in zip(yid_nodes, ycodes):
+        node.ycode = ycode
 
 
 def put_rom_leaves_back_into_tree(ppc_tree, leaves_dict_lst):
@@ -0,0 +1,115 @@
+"""Precompute the Yiddish script and ycode for every (rom, pos) in the corpus
+
+Collects the distinct (rom, pos) pairs, either from
+<new_corpus_dir>/ 'data' / 'json' / FILE.json  (--source json)
+or by merging the leaves of
+<new_corpus_dir>/ 'tmp' / 'prep_psd' / FILE.txt  (--source prep_psd)
+converts each pair once, spread over --jobs processes, and writes
+<new_corpus_dir>/ 'tmp' / 'rom_table.txt'
+(or --out) for make_json.py --rom-table.  See rom_table.py for the format.
+"""
+import os
+import logging
+import argparse
+import pathlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from ppctree.tree.ppc_tree import PPCTree
+from yiddishycode.translit import Transliterator
+from yid_leaf import YidLeaf
+from transform_trees_merge import merge_leaves
+from make_json_utils import add_rom_field
+from rom2uni.convert_rom2uni import convert, set_cache_dir
+from rom_table import write_rom_table
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+CHUNK_SIZE = 1000
+
+def pairs_from_json(fname):
+    """(rom, pos) of all the leaves in a json file"""
+    with open(fname, 'r', encoding='utf-8') as fin:
+        info = json.load(fin)
+    return {(leaf['rom'], leaf['pos'])
+            for out_dict in info
+            for leaf in out_dict['leaves']}
+
+def pairs_from_prep_psd(fname):
+    """(rom, pos) of all the merged leaves and their children in a prep_psd file"""
+    pairs = set()
+    with open(fname, 'r', encoding='utf-8') as fin:
+        for line in fin:
+            (tree_id, tree_str) = line.rstrip('\n').split('\t')
+            if tree_id == 'notreeid':
+                continue
+            ppc_tree = PPCTree(tree_str, term_class=YidLeaf)
+            yid_leaves = [leaf.detached_copy() for leaf in ppc_tree.nonempty_leaf_nodes]
+            add_rom_field(yid_leaves)
+            for leaf in merge_leaves(yid_leaves):
+                pairs.add((leaf.rom, leaf.pos))
+                for child in leaf.children:
+                    pairs.add((child.rom, child.pos))
+    return pairs
+
+TRANSLIT = None
+
+def init_worker(cache_dir):
+    """Make one Transliterator per process"""
+    global TRANSLIT  # pylint: disable=global-statement
+    TRANSLIT = Transliterator()
+    set_cache_dir(cache_dir)
+
+def convert_pairs(pairs):
+    """(rom, pos, yid, ycode) for each (rom, pos)"""
+    entries = []
+    for (rom, pos) in pairs:
+        yid = convert(rom, pos)
+        entries.append((rom, pos, yid, TRANSLIT.yiddish2ycode(yid)))
+    return entries
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Precompute the yid/ycode forms for make_json.py --rom-table.',
+        add_help=True)
+    parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--source', choices=('json', 'prep_psd'), default='json',
+                        help='where to collect the (rom, pos) pairs from (default: json)')
+    parser.add_argument('--out', type=pathlib.Path,
+                        help='output file (default: <new_corpus_dir>/tmp/rom_table.txt)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='number of worker processes (default: # of cpus)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    if args.source == 'json':
+        fnames = sorted((args.new_corpus_dir / 'data' / 'json').glob('./*.json'))
+        get_pairs = pairs_from_json
+    else:
+        fnames = sorted((args.new_corpus_dir / 'tmp' / 'prep_psd').glob('./*.txt'))
+        get_pairs = pairs_from_prep_psd
+    out_fname = args.out or args.new_corpus_dir / 'tmp' / 'rom_table.txt'
+    os.makedirs(out_fname.parent, exist_ok=True)
+
+    jobs = max(1, args.jobs or 1)
+    entries = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                             initargs=(args.new_corpus_dir / 'tmp',)) as executor:
+        pairs = set()
+        for one_pairs in tqdm(executor.map(get_pairs, fnames), total=len(fnames)):
+            pairs.update(one_pairs)
+        pairs = sorted(pairs)
+        logger.info('%d (rom, pos) pairs in %d files', len(pairs), len(fnames))
+        chunks = [pairs[i:i+CHUNK_SIZE] for i in range(0, len(pairs), CHUNK_SIZE)]
+        for one_entries in tqdm(executor.map(convert_pairs, chunks), total=len(chunks)):
+            entries.extend(one_entries)
+
+    write_rom_table(out_fname, entries)
+    logger.info('wrote %s', out_fname)
+
+if __name__ == '__main__':
+    main()
@@ -1,43 +1,135 @@
-"""Code to convert romanized version in treebank to yiddish script"""
+"""Code to convert romanized version in treebank to yiddish script
+
+The lookup files are read on the first call to convert, not at import.
+After set_cache_dir, the parsed tables are kept in
+<cache_dir> / 'rom2uni_lookups.pickle'
+(make_json.py uses <new_corpus_dir>/tmp), and reused as long as the lookup
+files' mtimes and sizes and this file's contents are the same.
+"""
+import os
+import hashlib
 import unicodedata
 import pathlib
+import functools
+import pickle
 import yiddish
 
 cwd = pathlib.Path(__file__).resolve().parent
 
-with open(cwd / 'rompos2uni_lookup.txt', 'r', encoding='utf-8') as fin:
-    lines = fin.readlines()
-lines = [line.rstrip('\n') for line in lines]
-lines = [line.split('\t') for line in lines
-         if line and line[0] != ';']
-rompos2uni = {(word, pos):script
-                   for (word, pos, script) in lines}
-
-with open(cwd / 'rompos_removehyphen.txt', 'r', encoding='utf-8') as fin:
-    lines = fin.readlines()
-lines = [line.rstrip('\n') for line in lines]
-lines = [line.split('\t') for line in lines
-         if line[0] != ';']
-rompos_removehyphen = set((word, pos) for (word, pos) in lines)
-
-with open(cwd / 'rompos_keephyphen.txt', 'r', encoding='utf-8') as fin:
-    lines = fin.readlines()
-lines = [line.rstrip('\n') for line in lines]
-lines = [line.split('\t') for line in lines
-         if line and line[0] != ';']
-rompos_keephyphen = set((word, pos) for (word, pos) in lines)
-
-
-with open(cwd / 'rompos_lkfalse.txt', 'r', encoding='utf-8') as fin:
-    lines = fin.readlines()
-lines = [line.rstrip('\n') for line in lines]
-lines = [line.split('\t') for line in lines
-         if line[0] != ';']
-rompos_lkfalse = set((word, pos) for (word, pos) in lines)
+LOOKUP_FNAMES = ['rompos2uni_lookup.txt',
+                 'rompos_removehyphen.txt',
+                 'rompos_keephyphen.txt',
+                 'rompos_lkfalse.txt']
+PICKLE_NAME = 'rom2uni_lookups.pickle'
+
+# where the pickle is kept, or None to not keep it, set by set_cache_dir
+cache_dir = None
+
+# the lookup tables, set by load_lookups
+rompos2uni = None
+rompos_removehyphen = None
+rompos_keephyphen = None
+rompos_lkfalse = None
+
+# size of the memo for convert, by default enough for the whole
+# PPCHY vocabulary
+MEMO_SIZE = 1 << 16
+
+def read_lookup(fname):
+    """Read one of the tab-separated lookup files, skipping ; comments"""
+    with open(fname, 'r', encoding='utf-8') as fin:
+        lines = fin.readlines()
+    lines = [line.rstrip('\n') for line in lines]
+    lines = [line.split('\t') for line in lines
+             if line and line[0] != ';']
+    return lines
+
+def read_lookups():
+    """Read the four lookup files into a dict and three sets"""
+    (fname_uni, fname_remove, fname_keep, fname_lkfalse) = [cwd / fname
+                                                            for fname in LOOKUP_FNAMES]
+    return ({(word, pos):script
+             for (word, pos, script) in read_lookup(fname_uni)},
+            set((word, pos) for (word, pos) in read_lookup(fname_remove)),
+            set((word, pos) for (word, pos) in read_lookup(fname_keep)),
+            set((word, pos) for (word, pos) in read_lookup(fname_lkfalse)))
+
+def set_cache_dir(dirname):
+    """Keep the parsed lookup tables in dirname, or not at all if None"""
+    global cache_dir  # pylint: disable=global-statement
+    cache_dir = dirname
+
+def lookups_key():
+    """mtime and size of each lookup file, and a hash of this file, to check the pickle against
+
+    The hash is for changes to how the files are read.
+    """
+    key = [hashlib.sha256(pathlib.Path(__file__).resolve().read_bytes()).hexdigest()]
+    for fname in LOOKUP_FNAMES:
+        stat = (cwd / fname).stat()
+        key.append((fname, stat.st_mtime_ns, stat.st_size))
+    return key
 
+def read_lookups_cached():
+    """read_lookups, through the pickle if there is a cache_dir and it is up to date"""
+    if cache_dir is None:
+        return read_lookups()
+    pickle_fname = cache_dir / PICKLE_NAME
+    key = lookups_key()
+    try:
+        with open(pickle_fname, 'rb') as fin:
+            (pickle_key, lookups) = pickle.load(fin)
+        if pickle_key == key:
+            return lookups
+    except (OSError, pickle.PickleError, EOFError, ValueError):
+        pass
+    lookups = read_lookups()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_fname = pickle_fname.with_name(f'{PICKLE_NAME}.{os.getpid()}')
+        with open(tmp_fname, 'wb') as fout:
+            pickle.dump((key, lookups), fout, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fname, pickle_fname)
+    except OSError:
+        # can't write there, just don't cache
+        pass
+    return lookups
+
+def load_lookups():
+    """(Re)read the lookup files, and clear the memo for convert"""
+    global rompos2uni, rompos_removehyphen, rompos_keephyphen, rompos_lkfalse  # pylint: disable=global-statement
+    (rompos2uni, rompos_removehyphen,
+     rompos_keephyphen, rompos_lkfalse) = read_lookups_cached()
+    clear_memo()
+
+def set_memo_size(maxsize):
+    """Replace the memo for convert with an empty one of size maxsize
+
+    maxsize=None means unbounded, and 0 turns off the memo.
+    """
+    global convert_memo  # pylint: disable=global-statement
+    convert_memo = functools.lru_cache(maxsize=maxsize)(convert_no_memo)
+
+def clear_memo():
+    """Empty the memo for convert, and zero the hit/miss counts"""
+    convert_memo.cache_clear()
+
+def memo_info():
+    """Return the memo's hits, misses, maxsize and currsize"""
+    return convert_memo.cache_info()
 
 def convert(rom, pos):
-    """convert romanized text to Yiddish script unicode"""
+    """convert romanized text to Yiddish script unicode
+
+    The result for each (rom, pos) is kept in a bounded memo, since the
+    same words come up over and over.
+    """
+    return convert_memo(rom, pos)
+
+def convert_no_memo(rom, pos):
+    """convert romanized text to Yiddish script unicode, without the memo"""
+    if rompos2uni is None:
+        load_lookups()
     # check if hard-coded as a lookup, bypassing detransliterate
     if (rom, pos) in rompos2uni:
         # assume already normalized
@@ -80,6 +172,8 @@ def convert(rom, pos):
     yid_text = unicodedata.normalize('NFC', yid_text_ret)
     return yid_text
 
+set_memo_size(MEMO_SIZE)
+
 def main():
     for (text, pos) in [
             ('oder', 'N'),
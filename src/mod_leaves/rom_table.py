@@ -0,0 +1,114 @@
+"""Precomputed Yiddish script and ycode for each (rom, pos) pair
+
+A rom table is a tab-separated file with a line
+rom	pos	yid	ycode
+for each distinct (rom, pos) in the corpus, as written by make_rom_table.py.
+The first line is a ;; comment with a fingerprint of the rom2uni lookup
+files, the conversion code (convert_rom2uni.py and this file) and the
+yiddish/yiddishycode versions, so a table made with other lookups or an
+older version of the conversion is not used.
+
+RomTable looks up the yid and ycode in the table, and falls back to
+convert and Transliterator.yiddish2ycode for pairs that aren't in it.
+Yiddish strings converted to ycode that way are added to the table, so
+each distinct string goes through yiddish2ycode only once per run.
+"""
+import logging
+import pathlib
+import hashlib
+from importlib import metadata
+from rom2uni.convert_rom2uni import convert
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+FINGERPRINT_PREFIX = ';; fingerprint '
+
+def make_fingerprint():
+    """Hash of the rom2uni lookup files and code, and the transliteration library versions"""
+    sha = hashlib.sha256()
+    rom2uni_dir = pathlib.Path(__file__).resolve().parent / 'rom2uni'
+    for fname in (sorted(rom2uni_dir.glob('*.txt')) +
+                  [rom2uni_dir / 'convert_rom2uni.py', pathlib.Path(__file__).resolve()]):
+        sha.update(fname.name.encode('utf-8'))
+        sha.update(fname.read_bytes())
+    for package in ('yiddish', 'yiddishycode'):
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = 'unknown'
+        sha.update(f'{package}\t{version}\n'.encode('utf-8'))
+    return sha.hexdigest()
+
+def write_rom_table(fname, entries):
+    """Write the table
+
+    Parameters
+    ==========
+    fname: Path
+        output file
+    entries: list of tuples
+        (rom, pos, yid, ycode) for each pair
+    """
+    with open(fname, 'w', encoding='utf-8') as fout:
+        fout.write(f'{FINGERPRINT_PREFIX}{make_fingerprint()}\n')
+        for entry in sorted(entries):
+            fout.write('\t'.join(entry) + '\n')
+
+
+class RomTable:
+    """yid and ycode lookups, with live conversion for unseen pairs
+
+    Parameters
+    ==========
+    translit: Transliterator
+        for converting yiddish script to ycode for what isn't in the table
+    fname: Path
+        the table file.  If None, or made with other lookup files,
+        everything is converted live.
+    """
+    def __init__(self, translit, fname=None):
+        self.translit = translit
+        self.rompos2yid = {}
+        self.yid2ycode = {}
+        if fname is not None:
+            self.read(fname)
+
+    def read(self, fname):
+        """Read the table, unless its fingerprint is out of date"""
+        with open(fname, 'r', encoding='utf-8') as fin:
+            lines = fin.readlines()
+        fingerprint = make_fingerprint()
+        if not lines or lines[0].rstrip('\n') != f'{FINGERPRINT_PREFIX}{fingerprint}':
+            logger.warning('%s was made with different lookup files, not using it', fname)
+            return
+        for line in lines[1:]:
+            (rom, pos, yid, ycode) = line.rstrip('\n').split('\t')
+            self.rompos2yid[(rom, pos)] = yid
+            self.yid2ycode[yid] = ycode
+
+    def yid(self, rom, pos):
+        """Same as convert(rom, pos)"""
+        yid = self.rompos2yid.get((rom, pos))
+        if yid is None:
+            yid = convert(rom, pos)
+        return yid
+
+    def ycode(self, yid):
+        """Same as translit.yiddish2ycode(yid)"""
+        ycode = self.yid2ycode.get(yid)
+        if ycode is None:
+            ycode = self.translit.yiddish2ycode(yid)
+            self.yid2ycode[yid] = ycode
+        return ycode
+
+    def ycodes(self, yids):
+        """Same as [translit.yiddish2ycode(yid) for yid in yids]
+
+        Each distinct yid not already known is converted once.
+        """
+        yid2ycode = self.yid2ycode
+        # dict.fromkeys keeps the order, so conversions happen in the
+        # same order as one at a time
+        for yid in dict.fromkeys(yid for yid in yids if yid not in yid2ycode):
+            yid2ycode[yid] = self.translit.yiddish2ycode(yid)
+        return [yid2ycode[yid] for yid in yids]
@@ -22,13 +22,68 @@ def add_simple_splits(pos2re):
             (pos, word1, word2, word3) = pos_words
             pos2re[pos].append((re.compile(rf'^(?P<word1>{word1})(?P<word2>{word2})(?P<word3>{word3})$'),
                                 r'\g<word1> \g<word2> \g<word3>'))
-POS2RE = defaultdict(list)
 
-add_simple_splits(POS2RE)
-add_generalized_cases(POS2RE)
-add_apostrophe(POS2RE)
+RE_GROUP_DEF = re.compile(r'\(\?P<(\w+)>')
+RE_GROUP_REF = re.compile(r'\\g<(\w+)>')
+
+def combine_regexes(regexes_lst):
+    """Compile the ordered (re_from, rep_to) for one pos into one regex
+
+    Each re_from becomes one alternative, in its own group r<i>, with
+    its groups renamed from word1 etc. to r<i>_word1 etc., and the same
+    for the references in rep_to.  The patterns are all anchored with ^,
+    so the alternatives are tried in order at the start of the word, and
+    the one that matches is the first of the re_from that would match.
+
+    Returns the combined regex and the dict from each r<i> to its rep_to.
+    """
+    alternatives = []
+    group2rep = {}
+    for (i, (re_from, rep_to)) in enumerate(regexes_lst):
+        prefix = f'r{i}_'
+        pattern = RE_GROUP_DEF.sub(rf'(?P<{prefix}\1>', re_from.pattern)
+        alternatives.append(f'(?P<r{i}>{pattern})')
+        group2rep[f'r{i}'] = RE_GROUP_REF.sub(rf'\\g<{prefix}\1>', rep_to)
+    return (re.compile('|'.join(alternatives)), group2rep)
+
+# the split regexes, set by load_splits the first time they're needed,
+# so importing this doesn't compile them
+POS2RE = None
+POS2SPLIT = None
+
+def load_splits():
+    """Read simple_splits.txt and compile the split regexes"""
+    global POS2RE, POS2SPLIT  # pylint: disable=global-statement
+    pos2re = defaultdict(list)
+    add_simple_splits(pos2re)
+    add_generalized_cases(pos2re)
+    add_apostrophe(pos2re)
+    POS2SPLIT = {pos: combine_regexes(regexes_lst)
+                 for (pos, regexes_lst) in pos2re.items()}
+    POS2RE = pos2re
 
 def split_word(pos, word):
+    if POS2SPLIT is None:
+        load_splits()
+    if pos not in POS2SPLIT:
+        #eprint(f'unknown pos {pos}')
+        return None
+    (re_split, group2rep) = POS2SPLIT[pos]
+    match = re_split.match(word)
+    if match is None:
+        return None
+    # the same as re.subn with the matching regex, including anything
+    # after a $ that matched before a final newline
+    new_words = match.expand(group2rep[match.lastgroup]) + word[match.end():]
+    return new_words.split()
+
+def split_word_by_regex(pos, word):
+    """split_word trying each regex in POS2RE[pos] in turn.
+
+    This is how split_word used to work, and is kept for checking it.
+    """
+    if POS2RE is None:
+        load_splits()
     if pos not in POS2RE:
         #eprint(f'unknown pos {pos}')
         return None
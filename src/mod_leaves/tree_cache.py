@@ -0,0 +1,97 @@
+"""Persistent cache of the process_file result for each tree
+
+The result of processing one tree (the out_dict in make_json.process_file)
+depends only on the tree string, do_yiddish_script_split, and the merge
+code, split patterns, rom2uni lookup files and the transliteration
+libraries.  The cache is an SQLite file mapping a hash of the tree string
+and do_yiddish_script_split to the finished out_dict.
+
+The cache also stores a fingerprint of the code, rule and lookup files
+and of the library versions.  If that has changed, the cache is cleared
+when it is opened, so a cached tree is never out of date.
+"""
+import sys
+import json
+import pathlib
+import sqlite3
+import hashlib
+from importlib import metadata
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import hash_file, stage_files
+
+def make_fingerprint():
+    """Hash of the mod_leaves code/rule/lookup files and library versions"""
+    sha = hashlib.sha256()
+    for fname in stage_files(pathlib.Path(__file__).resolve().parent):
+        sha.update(f'{fname.name}\t{hash_file(fname)}\n'.encode('utf-8'))
+    for package in ('yiddish', 'yiddishycode', 'ppctree'):
+        try:
+            version = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            version = 'unknown'
+        sha.update(f'{package}\t{version}\n'.encode('utf-8'))
+    return sha.hexdigest()
+
+
+class TreeCache:
+    """SQLite cache of processed trees
+
+    Parameters
+    ==========
+    fname: Path
+        SQLite file, created if it does not exist
+    """
+    def __init__(self, fname):
+        self.conn = sqlite3.connect(fname)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta '
+                          '(name TEXT PRIMARY KEY, value TEXT)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS trees '
+                          '(key TEXT PRIMARY KEY, out_dict TEXT)')
+        fingerprint = make_fingerprint()
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE name = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            self.conn.execute('DELETE FROM trees')
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)",
+                              (fingerprint,))
+            self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(tree_str, do_yiddish_script_split):
+        """Key for one tree"""
+        text = f'{int(do_yiddish_script_split)}\t{tree_str}'
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, tree_id, tree_str, do_yiddish_script_split):
+        """Return the cached out_dict for the tree, or None"""
+        row = self.conn.execute(
+            'SELECT out_dict FROM trees WHERE key = ?',
+            (self.make_key(tree_str, do_yiddish_script_split),)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        out_dict = json.loads(row[0])
+        # the same tree can have different ids
+        out_dict['tree_id'] = tree_id
+        return out_dict
+
+    def put(self, tree_str, do_yiddish_script_split, out_dict):
+        """Store the out_dict for the tree"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO trees VALUES (?, ?)',
+            (self.make_key(tree_str, do_yiddish_script_split),
+             json.dumps(out_dict, ensure_ascii=False)))
+
+    def commit(self):
+        """Write the trees stored so far"""
+        self.conn.commit()
+
+    def close(self):
+        """Commit and close the cache"""
+        self.conn.commit()
+        self.conn.close()
@@ -55,6 +55,30 @@ class YidLeaf(PPCNode):
         self.yid = None
         self.ycode = None
 
+    def detached_copy(self):
+        """Return a copy of the leaf without its links into the tree
+
+        Only the fields used for merging leaves and making the Yiddish
+        script forms are copied, so this is much cheaper than a
+        copy.deepcopy, which would also copy the tree through the
+        parent links.
+        """
+        leaf = YidLeaf.__new__(YidLeaf)
+        PPCNode.__init__(leaf)
+        leaf.start = self.start
+        leaf.end = self.end
+        leaf.pos = self.pos
+        leaf.pos_extra = self.pos_extra
+        leaf.gloss = self.gloss
+        leaf.split_before = self.split_before
+        leaf.split_after = self.split_after
+        leaf.text = self.text
+        leaf.children = [child.detached_copy() for child in self.children]
+        leaf.rom = self.rom
+        leaf.yid = self.yid
+        leaf.ycode = self.ycode
+        return leaf
+
     @staticmethod
     def is_nonempty_leaf():
         return True
@@ -0,0 +1,50 @@
+"""Check that names_numbers gives the same trees as names_numbers_chain
+
+Reads the PPCHY .psd files, flattens them as modify_psd.py does, applies the
+literal changes, and then compares the result of the combined
+names/numbers pass with the original sequence of regexes, for every tree
+in every file.  Differences are logged with the file name and tree.
+"""
+import sys
+import logging
+import argparse
+import pathlib
+from tqdm import trange
+from corpus_mods import literal_changes, names_numbers, names_numbers_chain
+from modify_psd import iter_file_trees
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Compare combined and sequential name/number changes.',
+        add_help=True)
+    parser.add_argument('corpus_dir', type=pathlib.Path, help='corpus psd directory')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    fnames = sorted(args.corpus_dir.glob('./*.psd'))
+
+    num_trees = 0
+    num_diffs = 0
+    for fnum in trange(len(fnames)):
+        fname = fnames[fnum]
+        for tree in iter_file_trees(fname):
+            tree = literal_changes.apply(tree)
+            tree1 = names_numbers(tree)
+            tree2 = names_numbers_chain(tree)
+            num_trees += 1
+            if tree1 != tree2:
+                num_diffs += 1
+                logger.warning('%s\nnames_numbers=\n%s\nnames_numbers_chain=\n%s\n',
+                               fname.name, tree1, tree2)
+    logger.info('%d trees, %d differences', num_trees, num_diffs)
+    if num_diffs:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
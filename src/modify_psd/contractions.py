@@ -1,4 +1,8 @@
 import re
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 FULL_VERB_3RD = '|'.join([
     #BEF
@@ -116,3 +120,209 @@ contraction_changes = [
      r"(\g<pos1> \g<word1>@) (NP-SBJ (PRO @\g<word2>))"),
 
     ]
+
+
+RE_GROUP_NAME = re.compile(r'\?(P<[^>]+>|:)')
+
+# the most alternatives kept for one literal, before giving up on making
+# it longer
+MAX_ALTERNATIVES = 32
+
+def group_end(pattern, num):
+    """Position just after the ) matching the ( at num"""
+    depth = 1
+    end = num + 1
+    while depth:
+        if pattern[end] == '\\':
+            end += 1
+        elif pattern[end] == '(':
+            depth += 1
+        elif pattern[end] == ')':
+            depth -= 1
+        end += 1
+    return end
+
+def split_alternatives(pattern):
+    """Split pattern at the | that are not inside a group or character class"""
+    branches = []
+    start = 0
+    num = 0
+    while num < len(pattern):
+        char = pattern[num]
+        if char == '\\':
+            num += 2
+        elif char == '[':
+            num = class_end(pattern, num)
+        elif char == '(':
+            num = group_end(pattern, num)
+        else:
+            if char == '|':
+                branches.append(pattern[start:num])
+                start = num + 1
+            num += 1
+    branches.append(pattern[start:])
+    return branches
+
+def class_end(pattern, num):
+    """Position just after the ] ending the character class starting at num"""
+    num += 1
+    if pattern[num] == ']':
+        num += 1
+    while pattern[num] != ']':
+        if pattern[num] == '\\':
+            num += 1
+        num += 1
+    return num + 1
+
+def group_content(pattern):
+    """The pattern inside a group, without the ?P<name> or ?:"""
+    if pattern.startswith('?'):
+        return RE_GROUP_NAME.sub('', pattern, count=1)
+    return pattern
+
+def plain_alternatives(pattern):
+    """Return the strings pattern matches, if it is just alternatives of plain strings
+
+    Groups inside are allowed if they are the same, like (')st.  Returns
+    None if pattern has anything else, or too many alternatives.
+    """
+    strings = []
+    for branch in split_alternatives(pattern):
+        branch_strings = ['']
+        num = 0
+        while num < len(branch):
+            char = branch[num]
+            if char == '\\':
+                escaped = branch[num + 1]
+                if escaped.isalnum():
+                    return None
+                branch_strings = [one + escaped for one in branch_strings]
+                num += 2
+            elif char == '(':
+                end = group_end(branch, num)
+                inner = plain_alternatives(group_content(branch[num + 1:end - 1]))
+                if inner is None or branch[end:end + 1] in ('*', '+', '?', '{'):
+                    return None
+                branch_strings = [one + two for one in branch_strings for two in inner]
+                num = end
+            elif char in '[]{}|*+?.^$)':
+                return None
+            else:
+                branch_strings = [one + char for one in branch_strings]
+                num += 1
+            if len(branch_strings) > MAX_ALTERNATIVES:
+                return None
+        strings.extend(branch_strings)
+    if len(strings) > MAX_ALTERNATIVES:
+        return None
+    return strings
+
+def required_literals(pattern):
+    """Find the literal strings that every match of pattern contains
+
+    Returns a list of tuples of strings: every match contains at least
+    one of the strings of each tuple.  A group that is just alternatives
+    of plain strings, like (?P<word1>'t|t') or (?P<pos2>BEF|HVF|MDF),
+    multiplies the strings it is part of, up to MAX_ALTERNATIVES, so
+    the rule for (PRO 's|s') gets ("(PRO 's)) (", "(PRO s')) (").
+    Character classes, escapes other than for punctuation, repeated
+    characters, and other groups end a literal.  If the pattern is an
+    alternation at the top level, an empty list is returned.
+    """
+    if len(split_alternatives(pattern)) > 1:
+        return []
+    runs = []
+    run = ['']
+    def end_run(start=('',)):
+        nonlocal run
+        runs.append(tuple(sorted(set(run))))
+        run = list(start)
+    num = 0
+    while num < len(pattern):
+        char = pattern[num]
+        if char == '\\':
+            escaped = pattern[num + 1]
+            if escaped.isalnum():
+                end_run()
+            else:
+                run = [one + escaped for one in run]
+            num += 2
+        elif char == '[':
+            num = class_end(pattern, num)
+            end_run()
+        elif char == '(':
+            end = group_end(pattern, num)
+            strings = plain_alternatives(group_content(pattern[num + 1:end - 1]))
+            if strings is None or pattern[end:end + 1] in ('*', '+', '?', '{'):
+                end_run()
+            elif len(run) * len(strings) > MAX_ALTERNATIVES:
+                end_run(strings)
+            else:
+                run = [one + two for one in run for two in strings]
+            num = end
+        elif char in '*+?{':
+            # quantifier applies to the preceding character
+            run = [one[:-1] for one in run]
+            end_run()
+            num += 1
+        elif char in '.^$':
+            end_run()
+            num += 1
+        else:
+            run = [one + char for one in run]
+            num += 1
+    end_run()
+    runs = [one for one in set(runs) if all(one)]
+    # drop the ones that are implied by another one: if every string of
+    # the other contains one of its strings
+    def implied(one, other):
+        return one != other and all(any(part in string for part in one) for string in other)
+    return sorted([one for one in runs
+                   if not any(implied(one, other) for other in runs)],
+                  key=lambda one: (-min(len(string) for string in one), one))
+
+# each rule also has the literal strings that must be in the tree for the
+# regex to match, as tuples of which one has to be there, so the regex is
+# only run on trees that have one of each tuple
+contraction_rules = [(re_from, rep_to, required_literals(re_from.pattern))
+                     for (re_from, rep_to) in contraction_changes]
+
+# for each rule, how many trees didn't have the literals ('skipped'),
+# had it but didn't match ('miss'), or were changed ('hit')
+contraction_counts = [Counter() for _ in contraction_rules]
+
+def apply_contractions(tree):
+    """Apply the contraction_changes to the tree, in order"""
+    for (num, (re_from, rep_to, literals)) in enumerate(contraction_rules):
+        if not all(any(literal in tree for literal in any_of) for any_of in literals):
+            contraction_counts[num]['skipped'] += 1
+            continue
+        (tree, nsub) = re_from.subn(rep_to, tree)
+        if nsub:
+            contraction_counts[num]['hit'] += 1
+        else:
+            contraction_counts[num]['miss'] += 1
+    return tree
+
+def reset_contraction_counts():
+    """Zero the counts, returning the ones so far"""
+    counts_lst = [Counter(counts) for counts in contraction_counts]
+    for counts in contraction_counts:
+        counts.clear()
+    return counts_lst
+
+def log_contraction_counts(counts_lst=None):
+    """Log the skipped/miss/hit counts for each contraction rule
+
+    Parameters
+    ==========
+    counts_lst: list of Counter
+        counts for each rule, if not the ones in contraction_counts.
+        Used when the counts were collected in other processes.
+    """
+    if counts_lst is None:
+        counts_lst = contraction_counts
+    for (num, ((_, _, literals), counts)) in enumerate(
+            zip(contraction_rules, counts_lst)):
+        logger.info('contraction rule %d %r: skipped=%d miss=%d hit=%d',
+                    num, literals, counts['skipped'], counts['miss'], counts['hit'])
@@ -19,7 +19,8 @@ original tokens for the POS tokens.
 
 import re
 import pathlib
-from contractions import contraction_changes
+from contractions import apply_contractions
+from literal_changes import LiteralChanges
 
 RE_COLON = re.compile(r'\(NPR (?P<name>[A-Z\-a-z]+):\)')
 
@@ -34,6 +35,15 @@ RE_NUM4 = re.compile(r'\(NUM (?P<p1>[a-z]+)_(?P<p2>[a-z]+)_(?P<p3>[a-z]+)_(?P<p4
 RE_NUM3 = re.compile(r'\(NUM (?P<p1>[a-z]+)_(?P<p2>[a-z]+)_(?P<p3>[a-z]+)\)')
 RE_NUM2 = re.compile(r'\(NUM (?P<p1>[a-z]+)_(?P<p2>[a-z]+)\)')
 
+# The above as one regex, so that names_numbers can do them all in one
+# scan of the tree. NUMP has to come before NUM
+RE_NAMES_NUMBERS = re.compile(
+    r'\(NPR (?P<colon>[A-Z\-a-z]+):\)'
+    r'|\((?P<pos>NPR\$?) (?P<names>[A-Za-z]+(?:[-][A-Za-z]+){1,2})\)'
+    r'|\(NUMP \(NUM (?P<nump>[a-z]+(?:_[a-z]+){1,3})\)\)'
+    r'|\(NUM (?P<num>[a-z]+(?:_[a-z]+){1,3})\)')
+RE_NAME_PART = re.compile(r'[A-Za-z]+')
+
 def read_changes(fname):
     """Reads either corpus-changes.txt or underscores.txt
 
@@ -50,12 +60,14 @@ def read_changes(fname):
 cwd = pathlib.Path(__file__).resolve().parent
 changes = read_changes(cwd / 'corpus-changes.txt')
 underscore_changes = read_changes(cwd / 'underscores.txt')
+literal_changes = LiteralChanges(changes + underscore_changes)
 
-def make_changes(tree):
-    """Apply modifications to each line of the tree"""
-    for (from_, to_) in changes + underscore_changes:
-        tree = tree.replace(from_, to_)
+def names_numbers_chain(tree):
+    """Colon, name and number changes, one regex at a time
 
+    This is the original version of names_numbers, kept to check
+    that the two give the same result.
+    """
     # change (NPR rokhl:) to (NPR rokhl) (PUNC :)
     tree = RE_COLON.sub(r'(NPR \g<name>) (PUNC :)', tree)
 
@@ -74,8 +86,55 @@ def make_changes(tree):
     tree = RE_NUM4.sub(r'(NUMP (NUM \g<p1>) (NUM \g<p2>) (NUM \g<p3>) (NUM \g<p4>))', tree)
     tree = RE_NUM3.sub(r'(NUMP (NUM \g<p1>) (NUM \g<p2>) (NUM \g<p3>))', tree)
     tree = RE_NUM2.sub(r'(NUMP (NUM \g<p1>) (NUM \g<p2>))', tree)
+    return tree
+
+def split_name(pos, name):
+    """Separate a hyphenated name, as RE_NAMES3 and RE_NAMES2 do"""
+    parts = name.split('-')
+    if (len(parts) not in (2, 3) or
+            not all(RE_NAME_PART.fullmatch(part) for part in parts)):
+        return f'({pos} {name})'
+    leaves = [f'(NPR {part})' for part in parts[:-1]]
+    leaves.append(f'({pos} {parts[-1]})')
+    return ' '.join(leaves)
+
+def split_number(number):
+    """Separate a number with underscores into a NUMP"""
+    leaves = ' '.join([f'(NUM {part})' for part in number.split('_')])
+    return f'(NUMP {leaves})'
+
+def names_numbers_rep(mtch):
+    """Replacement for each match of RE_NAMES_NUMBERS"""
+    group_dict = mtch.groupdict()
+    if group_dict['colon'] is not None:
+        # change (NPR rokhl:) to (NPR rokhl) (PUNC :)
+        # the name can then be separated as below
+        return split_name('NPR', group_dict['colon']) + ' (PUNC :)'
+    if group_dict['names'] is not None:
+        # separate hyphenated names. Names could be NPR or NPR$
+        # so keep pos for last part
+        return split_name(group_dict['pos'], group_dict['names'])
+    if group_dict['nump'] is not None:
+        # numbers already under a NUMP
+        return split_number(group_dict['nump'])
+    # numbers not already under a NUMP
+    return split_number(group_dict['num'])
+
+def names_numbers(tree):
+    """Colon, name and number changes in one scan of the tree
+
+    Same result as names_numbers_chain
+    """
+    return RE_NAMES_NUMBERS.sub(names_numbers_rep, tree)
+
+def make_changes(tree):
+    """Apply modifications to each line of the tree"""
+    # same as tree.replace(from_, to_) for each of
+    # changes + underscore_changes, in order
+    tree = literal_changes.apply(tree)
+
+    tree = names_numbers(tree)
 
-    for (from_, to_) in contraction_changes:
-        tree = re.sub(from_, to_, tree)
+    tree = apply_contractions(tree)
 
     return tree
@@ -0,0 +1,124 @@
+"""Single-pass search for the literal corpus changes
+
+The changes in corpus-changes.txt and underscores.txt are plain from/to
+string replacements that are applied in order.  Instead of running
+str.replace for every change on every tree, an Aho-Corasick automaton over
+all the 'from' strings finds, in one left-to-right scan of the tree,
+which changes actually occur in it.  Only those changes are then applied,
+in the original order.
+
+Since one change can create a new match for a later change (e.g. a
+romanization fix that produces a word later split in underscores.txt),
+each change also records the later changes that its replacement text
+could feed.  When a change is applied, the changes it feeds are
+added to the ones still to be tried, so the result is the same as
+applying all the changes one after the other.
+"""
+import heapq
+from collections import deque
+
+
+def could_feed(to_, from_):
+    """Check if inserting to_ into a string could create a new from_
+
+    A new occurrence of from_ has to overlap the inserted to_ text, so
+    either one contains the other, or a suffix of one is a prefix of
+    the other.  If to_ is empty, the text on either side of it is
+    joined, and anything can happen.
+    """
+    if not to_:
+        return True
+    if from_ in to_ or to_ in from_:
+        return True
+    for num in range(1, min(len(to_), len(from_))):
+        if to_.endswith(from_[:num]) or from_.endswith(to_[:num]):
+            return True
+    return False
+
+
+class LiteralChanges:
+    """Ordered literal replacements applied with one scan per tree
+
+    Parameters
+    ==========
+    changes: list of pairs
+        (from, to) string replacements, in the order in which
+        they are to be applied
+    """
+    def __init__(self, changes):
+        self.changes = [(from_, to_) for (from_, to_) in changes]
+        for (from_, _) in self.changes:
+            assert from_, 'empty change'
+        self._build_automaton()
+        # feeds[num] is the list of later changes that the
+        # replacement text of change num could create a match for
+        self.feeds = [
+            [num2 for num2 in range(num + 1, len(self.changes))
+             if could_feed(to_, self.changes[num2][0])]
+            for (num, (_, to_)) in enumerate(self.changes)]
+
+    def _build_automaton(self):
+        """Build the goto, fail and output tables for the 'from' strings"""
+        self.goto = [{}]
+        self.outputs = [[]]
+        for (num, (from_, _)) in enumerate(self.changes):
+            state = 0
+            for char in from_:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.outputs.append([])
+                state = next_state
+            self.outputs[state].append(num)
+
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for (char, next_state) in self.goto[state].items():
+                queue.append(next_state)
+                fail_state = self.fail[state]
+                while fail_state and char not in self.goto[fail_state]:
+                    fail_state = self.fail[fail_state]
+                fail_state = self.goto[fail_state].get(char, 0)
+                self.fail[next_state] = fail_state
+                # so each state has the outputs for all the suffixes too
+                self.outputs[next_state] = (self.outputs[next_state] +
+                                            self.outputs[fail_state])
+
+    def find(self, tree):
+        """Return the set of changes whose 'from' string occurs in tree"""
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        found = set()
+        state = 0
+        for char in tree:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def apply(self, tree):
+        """Apply the changes to tree, same as str.replace for each in order"""
+        todo = list(self.find(tree))
+        if not todo:
+            return tree
+        heapq.heapify(todo)
+        seen = set(todo)
+        while todo:
+            num = heapq.heappop(todo)
+            (from_, to_) = self.changes[num]
+            new_tree = tree.replace(from_, to_)
+            if new_tree == tree:
+                continue
+            tree = new_tree
+            for num2 in self.feeds[num]:
+                if num2 not in seen:
+                    seen.add(num2)
+                    heapq.heappush(todo, num2)
+        return tree
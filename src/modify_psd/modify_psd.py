@@ -6,50 +6,136 @@ It flattens the files in order to apply the changes.
 
 Currently only 1910e-grine-felder.psd and 1947e-royte-pomerantsen.psd are
 modified.
+
+The files are independent, so with --jobs N they are done in N processes.
+The output is the same as with --jobs 1.
+
+Files whose input and rule files are unchanged since the last run are
+skipped (see manifest.py), unless --force is given.
+
+With --profile, the times for reading the files and for each kind of
+change are added to the profile report (see profiling.py).
 """
 import os
+import sys
 import re
 import logging
 import argparse
 import pathlib
-from tqdm import trange
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
 from corpus_mods import make_changes
+from contractions import (contraction_rules,
+                          log_contraction_counts,
+                          reset_contraction_counts)
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest, stage_files
+import profiling
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# the rule files and the code, so that a change to either
+# redoes all the files
+STAGE_DEPS = stage_files(pathlib.Path(__file__).resolve().parent)
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'iter_file_trees', 'read_file'),
+    (__name__, 'make_changes', 'make_changes'),
+    ('literal_changes', 'LiteralChanges.apply', 'literal_changes'),
+    ('corpus_mods', 'names_numbers', 'names_numbers'),
+    ('corpus_mods', 'apply_contractions', 'contractions'),
+]
+
+RE_SPACES = re.compile(r"[ \t]+")
+
 def join_and_flatten_tree(tree_lines):
-    """Flattens multi-line psd lines for one tree"""
-    tree = ' '.join([line.strip() for line in tree_lines]) + ' '
-    tree = re.sub(r"\t", " ", tree)
-    tree = re.sub(r" +", " ", tree)
+    """Flattens multi-line psd lines for one tree
+
+    Tabs and runs of spaces are collapsed to one space in a single pass.
+    """
+    tree = ' '.join([line.strip() for line in tree_lines])
+    tree = RE_SPACES.sub(' ', tree)
     tree = tree.strip()
     return tree
 
-def read_file(fname):
-    """Read all the trees in one .psd file.
+def iter_file_trees(fname):
+    """Generate the trees in one .psd file, one at a time
 
     Assumes the trees in the input .psd file are pretty-printed
-    over multiple lines, and converts them to a flat representation
+    over multiple lines, and converts them to a flat representation.
+    Only the lines of the current tree are kept in memory.
 
     Parameters
     ==========
     fname: Path
         input psd file
     """
-    all_trees = []
     tree_lines = []
     with open(fname, 'r', encoding='utf-8') as in_file:
         for line in in_file:
             line = line.rstrip('\n')
             if line.startswith("("):
                 if tree_lines:
-                    all_trees.append(join_and_flatten_tree(tree_lines))
+                    yield join_and_flatten_tree(tree_lines)
                 tree_lines = [line]
             elif line:
                 tree_lines.append(line)
     if tree_lines:
-        all_trees.append(join_and_flatten_tree(tree_lines))
-    return all_trees
+        yield join_and_flatten_tree(tree_lines)
+
+def read_file(fname):
+    """Read all the trees in one .psd file.
+
+    Same as iter_file_trees, but returns a list of all the trees.
+
+    Parameters
+    ==========
+    fname: Path
+        input psd file
+    """
+    return list(iter_file_trees(fname))
+
+
+def modify_file(fname, out_dir):
+    """Read, modify and write one .psd file
+
+    Returns the contraction rule counts for this file, so they can be
+    combined when the files are done in separate processes.
+
+    Parameters
+    ==========
+    fname: Path
+        input psd file
+    out_dir: Path
+        directory for the output psd file
+    """
+    reset_contraction_counts()
+    try:
+        # changes only apply to 1910e-grine-felder.psd and
+        # 1947e-royte-pomerantsen.psd
+        trees = iter_file_trees(fname)
+        if fname.stem.startswith('1910') or fname.stem.startswith('1947'):
+            trees = (make_changes(tree) for tree in trees)
+        with open(out_dir / fname.name, 'w', encoding='utf-8') as fout:
+            num_trees = 0
+            for tree in trees:
+                fout.write(tree + '\n')
+                num_trees += 1
+            # an empty input file still gets one (empty) line
+            if num_trees == 0:
+                fout.write('\n')
+    except Exception as err:
+        raise RuntimeError(f'error modifying {fname}: {err!r}') from err
+    return reset_contraction_counts()
+
+def add_counts(total_counts, counts_lst):
+    """Add the per-rule counts for one file to the totals"""
+    for (total, counts) in zip(total_counts, counts_lst):
+        total.update(counts)
 
 
 def main():
@@ -59,25 +145,63 @@ def main():
         add_help=True)
     parser.add_argument('corpus_dir', type=pathlib.Path, help='corpus psd directory')
     parser.add_argument('new_corpus_dir', type=pathlib.Path, help='output root directory')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(),
+                        help='number of processes for the files (default: # cores)')
+    parser.add_argument('--contraction-counts', action='store_true',
+                        help='log skipped/miss/hit counts for each contraction rule')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     args = parser.parse_args()
 
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
-    fnames = list(args.corpus_dir.glob('./*.psd'))
-
-    os.makedirs(args.new_corpus_dir / 'tmp' / 'mod_psd', exist_ok=True)
-
-    for fnum in trange(len(fnames)):
-        fname = fnames[fnum]
-        # changes only apply to 1910e-grine-felder.psd and
-        # 1947e-royte-pomerantsen.psd
-        trees = read_file(fname)
-        if fname.stem.startswith('1910') or fname.stem.startswith('1947'):
-            trees = [make_changes(tree) for tree in trees]
-        with open(args.new_corpus_dir / 'tmp' / 'mod_psd' / fname.name, 'w', encoding='utf-8') as fout:
-            fout.write('\n'.join(trees) + '\n')
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    fnames = sorted(args.corpus_dir.glob('./*.psd'))
+
+    out_dir = args.new_corpus_dir / 'tmp' / 'mod_psd'
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = Manifest(out_dir, STAGE_DEPS)
+    fname2key = {fname: manifest.key([fname]) for fname in fnames}
+    if not args.force:
+        fnames = [fname for fname in fnames
+                  if not manifest.is_current(out_dir / fname.name, fname2key[fname])]
+        logger.info('%d files to redo, %d unchanged',
+                    len(fnames), len(fname2key) - len(fnames))
+
+    total_counts = [Counter() for _ in contraction_rules]
+    try:
+        if args.jobs <= 1:
+            for fname in tqdm(fnames):
+                add_counts(total_counts, modify_file(fname, out_dir))
+                manifest.record(out_dir / fname.name, fname2key[fname])
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs,
+                                     initializer=profiling.init_worker,
+                                     initargs=(profiling.TARGETS,)) as executor:
+                future2fname = {executor.submit(profiling.call, modify_file, fname, out_dir): fname
+                                for fname in fnames}
+                for future in tqdm(as_completed(future2fname), total=len(future2fname)):
+                    (counts_lst, stats) = future.result()
+                    add_counts(total_counts, counts_lst)
+                    profiling.merge(stats)
+                    fname = future2fname[future]
+                    manifest.record(out_dir / fname.name, fname2key[fname])
+    finally:
+        manifest.save()
+
+    if args.contraction_counts:
+        log_contraction_counts(total_counts)
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'modify_psd')
 
 if __name__ == '__main__':
     main()
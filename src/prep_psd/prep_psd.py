@@ -13,17 +13,58 @@ The tree is modified with:
     (CODE <$$paren>) replaced with  (CPAREN -RRB-)
 (3) 0 and * leaves replaced with (-NONE- 0) or (-NONE- *)
 (4) (CODE {...}) replaced with (-NONE- (CODE {...}))
+
+Files whose input and rule files are unchanged since the last run are
+skipped (see manifest.py), unless --force is given.
+
+With --verify, each tree is also converted to a PPCTree and back, to
+check that the string comes out the same.
+
+With --jobs N, the trees are done by N worker processes, in chunks of
+--chunk-trees trees, biggest first (see chunk_scheduler.py).
+
+With --profile, the times for reading the files, prep_psd_utils.process
+and the PPCTree parsing for --verify are added to the profile report (see
+profiling.py).
 """
 import os
+import sys
 import logging
 import argparse
 import pathlib
-from tqdm import trange
+from tqdm import tqdm
 
 from prep_psd_utils import process
 
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest, stage_files
+from chunk_scheduler import CHUNK_TREES, run_chunks
+import profiling
+
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+STAGE_DEPS = stage_files(pathlib.Path(__file__).resolve().parent)
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'read_trees', 'read_file'),
+    (__name__, 'process', 'prep_psd_process'),
+    ('prep_psd_utils', 'PPCTree', 'ppctree_parse'),
+]
+
+def process_trees(trees, verify):
+    """The output line for each tree"""
+    lines = []
+    for tree in trees:
+        info = process(tree, verify)
+        lines.append(f'{info.tree_id}\t{info.tree_str}\n')
+    return lines
+
+def read_trees(fname):
+    """The trees in one mod_psd file, one per line"""
+    with open(fname, 'r', encoding='utf-8') as fin:
+        return [line.rstrip('\n') for line in fin]
 
 def main():
     """main loop"""
@@ -31,12 +72,26 @@ def main():
         description='Convert .psd files to form for futher processing.',
         add_help=True)
     parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--verify', action='store_true',
+                        help='check each tree by converting it to a PPCTree and back')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes (default: 1, no workers)')
+    parser.add_argument('--chunk-trees', type=int, default=CHUNK_TREES,
+                        help=f'max # of trees sent to a worker at a time (default: {CHUNK_TREES})')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     args = parser.parse_args()
 
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
     tmp1_dir = args.new_corpus_dir / 'tmp' / 'mod_psd'
     tmp2_dir = args.new_corpus_dir / 'tmp' / 'prep_psd'
 
@@ -44,19 +99,38 @@ def main():
 
     fnames = list(tmp1_dir.glob('./*.psd'))
 
-    for fnum in trange(len(fnames)):
-        fname = fnames[fnum]
-
-        with open(fname, 'r', encoding='utf-8') as fin:
-            lines = fin.readlines()
-        trees = [line.rstrip('\n') for line in lines]
-        info_lst = [process(tree) for tree in trees]
-
-        stem = fname.stem
-        with open(tmp2_dir / f'{stem}.txt',
-                  'w', encoding='utf-8') as fout:
-            for info in info_lst:
-                fout.write(f'{info.tree_id}\t{info.tree_str}\n')
+    manifest = Manifest(tmp2_dir, STAGE_DEPS)
+
+    # the files to redo, with their manifest keys
+    todo = []
+    for fname in fnames:
+        out_fname = tmp2_dir / f'{fname.stem}.txt'
+        key = manifest.key([fname])
+        if not args.force and manifest.is_current(out_fname, key):
+            continue
+        todo.append((fname, out_fname, key))
+
+    def write_file(out_fname, key, lines):
+        with open(out_fname, 'w', encoding='utf-8') as fout:
+            fout.writelines(lines)
+        manifest.record(out_fname, key)
+
+    try:
+        if args.jobs > 1:
+            files = [(fname.stem, read_trees(fname), (args.verify,))
+                     for (fname, _, _) in todo]
+            for ((_, lines), (_, out_fname, key)) in zip(
+                    tqdm(run_chunks(files, process_trees, args.jobs, args.chunk_trees),
+                         total=len(todo)), todo):
+                write_file(out_fname, key, lines)
+        else:
+            for (fname, out_fname, key) in tqdm(todo):
+                write_file(out_fname, key, process_trees(read_trees(fname), args.verify))
+    finally:
+        manifest.save()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'prep_psd')
 
 if __name__ == '__main__':
     main()
@@ -5,8 +5,10 @@ import logging
 from collections import namedtuple
 from ppctree.tree.ppc_tree import PPCTree
 
+# ppc_tree is the PPCTree made by process with verify and term_class,
+# so it doesn't have to be parsed again
 PsdInfo = namedtuple(
-    'PsdInfo', 'tree_id tree_str')
+    'PsdInfo', 'tree_id tree_str ppc_tree', defaults=(None,))
 
 RE_LEAVES = re.compile(r"\(([^ ]+?) ([^ ]+?)\)")
 ID_FIND = re.compile(r" \(ID ([^)]+)\)$")
@@ -39,33 +41,78 @@ def find_end_of_next_tree(tree, current_index):
 
 
 
-def process(tree_str):
-    """Modifies tree_str and determines whether to use it."""
-    #There are some cases with the function tags split up,
-    #always with -SPE at the end.  e.g.
-    #IP-MAT=1-SPE
-    #Since we don't care right now about SPE, just remove it and avoid
-    #any complications
-    #tree_str = tree_str.replace('-SPE', '')
-
-
-    assert (tree_str[0] == '(' and
-            tree_str[-1] == ")"), \
-            f'something wrong with tree {tree_str}'
-
-    # take off surrounding parens
-    tree_str = tree_str[1:-1].strip()
-
-    # Check for tree id and remove it from tree_str
-    # if a tree has no ID then it's just meta data and ignored
-    # e.g. (CODE <P_26>)
-    match_id = ID_FIND.search(tree_str)
-    if match_id is None:
-        return PsdInfo('notreeid', tree_str)
-
-    tree_id = match_id.group(1)
-    tree_str = tree_str.replace(match_id.group(0), "")
-
+RE_TOKEN = re.compile(
+    r"\((?P<pos>[^ ()]+) (?P<word>[^ ()]+)\)"  # leaf
+    r"|\((?P<label>[^ ()]+) (?=\()"           # nonterminal and its space
+    r"|(?P<close>\))"
+    r"|(?P<sep> )(?=\()")                      # space between siblings
+
+# the tokens that can come before each kind of token
+PREV_OK = {
+    'word': (None, 'label', 'sep'),
+    'label': (None, 'label', 'sep'),
+    'sep': ('word', 'close'),
+    'close': ('word', 'close'),
+}
+
+def scan_tree(tree_id, tree_str):
+    """Check and modify the tree in one pass over its tokens
+
+    For a tree with single spaces between nodes and no parens or spaces
+    in labels or words, this does the same checks and changes as
+    check_and_fix_tree, in one pass.  Returns the modified tree_str and
+    the number of leaves, or None if the tree has any other form, in
+    which case check_and_fix_tree is used instead, to get the same
+    result or error.
+    """
+    pieces = []
+    num_leaves = 0
+    num_words = 0
+    depth = 0
+    prev = None
+    last = 0
+    for match in RE_TOKEN.finditer(tree_str):
+        kind = match.lastgroup
+        if (match.start() != last or prev not in PREV_OK[kind] or
+                (depth == 0 and prev is not None)):
+            return None
+        last = match.end()
+        prev = kind
+        if kind == 'word':
+            num_leaves += 1
+            (pos, word) = match.group('pos', 'word')
+            if pos == 'CODE' and word == '<paren>':
+                pieces.append('(OPAREN -LRB-)')
+                num_words += 1
+            elif pos == 'CODE' and word == '<$$paren>':
+                pieces.append('(CPAREN -RRB-)')
+                num_words += 1
+            elif word == '0' or word[0] == '*':
+                pieces.append(f'({pos} (-NONE- {word}))')
+            elif pos == 'CODE':
+                pieces.append(f'(CODE (-NONE- {word}))')
+                num_words += 1
+            else:
+                pieces.append(match.group())
+                num_words += 1
+        elif kind == 'label':
+            depth += 1
+            pieces.append(match.group())
+        elif kind == 'close':
+            depth -= 1
+            pieces.append(')')
+        else:
+            pieces.append(' ')
+    if last != len(tree_str) or depth != 0 or prev not in ('word', 'close'):
+        return None
+    assert num_words, f'no words in tree {tree_id}'
+    return (''.join(pieces), num_leaves)
+
+def check_and_fix_tree(tree_id, tree_str):
+    """Check and modify the tree, with a pass over it for each step
+
+    Returns the modified tree_str and the number of leaves.
+    """
     # change CODE for parens to OPAREN/CPAREN so they'll be kept when
     # CODE stuff is modified below
     tree_str = tree_str.replace(
@@ -79,16 +126,16 @@ def process(tree_str):
     # pos here can also be a NT, if (NT 0)
     words = [word for (pos, word) in leaves
              if word != '0' and not word.startswith('*')]
-    assert words, 'no words'
+    assert words, f'no words in tree {tree_id}'
 
     # missing word in leaf, like (pos )
     match_bad_leaf = RE_ILLEGAL_LEAF.search(tree_str)
-    assert match_bad_leaf is None, 'bad leaf'
+    assert match_bad_leaf is None, f'bad leaf in tree {tree_id}'
 
     # Check that there is only one tree in tree_str.
     start_next_tree = find_end_of_next_tree(tree_str, 0)
     assert start_next_tree == len(tree_str), \
-        f'more than one tree {tree_str}'
+        f'more than one tree {tree_id} {tree_str}'
 
     # Add -NONE- pos for 0 and *
     # Also change (CODE {stuff}) to (CODE (-NONE {stuff}))
@@ -96,17 +143,64 @@ def process(tree_str):
     tree_str = ZERO_FIX.sub(r'(\1 (-NONE- \2))', tree_str)
     tree_str = TRACE_FIX.sub(r'(\1 (-NONE- \2))', tree_str)
     tree_str = CODE_FIX.sub(r'(CODE (-NONE- \1))', tree_str)
+    return (tree_str, len(leaves))
+
+def process(tree_str, verify=False, term_class=None):
+    """Modifies tree_str and determines whether to use it.
+
+    If verify is true, also check that converting the result to a
+    PPCTree and back gives the same string, with the same # of leaves.
+    If term_class is also given, the PPCTree is made with it for the
+    leaves and returned in the PsdInfo, if the check came out the same.
+    """
+    #There are some cases with the function tags split up,
+    #always with -SPE at the end.  e.g.
+    #IP-MAT=1-SPE
+    #Since we don't care right now about SPE, just remove it and avoid
+    #any complications
+    #tree_str = tree_str.replace('-SPE', '')
+
+
+    assert (tree_str[0] == '(' and
+            tree_str[-1] == ")"), \
+            f'something wrong with tree {tree_str}'
+
+    # take off surrounding parens
+    tree_str = tree_str[1:-1].strip()
+
+    # Check for tree id and remove it from tree_str
+    # if a tree has no ID then it's just meta data and ignored
+    # e.g. (CODE <P_26>)
+    match_id = ID_FIND.search(tree_str)
+    if match_id is None:
+        return PsdInfo('notreeid', tree_str)
+
+    tree_id = match_id.group(1)
+    tree_str = tree_str.replace(match_id.group(0), "")
 
-    fulltree = PPCTree(tree_str)
-    # this is just a check of the tree conversion, to make sure that the string resulting
-    # from the PPCTree object is the same as the original.
-    ft_mystr = fulltree.mystr()
-    if ft_mystr != tree_str:
-        logger.warning("tree_str=\n%s", tree_str)
-        logger.warning("ft_mystr=\n%s\n", ft_mystr)
-    # number of leaves should be the same as the leaves found
-    # from the string
-    assert len(fulltree.all_leaf_nodes) == len(leaves), \
-        '# leaves is different'
-
-    return PsdInfo(tree_id, tree_str)
+    result = scan_tree(tree_id, tree_str)
+    if result is None:
+        result = check_and_fix_tree(tree_id, tree_str)
+    (tree_str, num_leaves) = result
+
+    ppc_tree = None
+    if verify:
+        if term_class is None:
+            fulltree = PPCTree(tree_str)
+        else:
+            fulltree = PPCTree(tree_str, term_class=term_class)
+        # this is just a check of the tree conversion, to make sure that the string resulting
+        # from the PPCTree object is the same as the original.
+        ft_mystr = fulltree.mystr()
+        if ft_mystr != tree_str:
+            logger.warning("tree %s", tree_id)
+            logger.warning("tree_str=\n%s", tree_str)
+            logger.warning("ft_mystr=\n%s\n", ft_mystr)
+        # number of leaves should be the same as the leaves found
+        # from the string
+        assert len(fulltree.all_leaf_nodes) == num_leaves, \
+            f'# leaves is different in tree {tree_id}'
+        if term_class is not None and ft_mystr == tree_str:
+            ppc_tree = fulltree
+
+    return PsdInfo(tree_id, tree_str, ppc_tree)
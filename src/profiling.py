@@ -0,0 +1,179 @@
+"""Wall and cpu time for the parts of each stage, for --profile
+
+Each stage script lists the functions to time as PROFILE_TARGETS, tuples
+(module name, attribute, component), for example
+    ('make_json_utils', 'split_word', 'split_word')
+    ('yid_leaf', 'YidLeaf.detached_copy', 'detached_copy')
+enable() replaces each of them with a wrapper that adds up the calls,
+wall time and cpu time for the component, so nothing is timed, and
+nothing is slowed down, without --profile.  The attribute is replaced in
+the module that calls the function (which is __main__ for a function
+called in the stage script itself), since that's where the name is looked
+up.  A generator function is timed for the steps of the generator, not
+including the time spent by the code reading from it.  Recursive and
+nested calls to the same component are only counted once.
+
+Worker processes add up their own times, and send them back with their
+results (see call and take) to be merged with the main process's.
+
+write_report writes the times to a json file, by default
+<new_corpus_dir> / 'tmp' / 'profile.json'
+with an entry for each stage, so that one run of run.sh with --profile
+gives one report for the whole pipeline:
+{"stages": {"make_json": {"wall": ..., "cpu": ..., "argv": [...],
+                          "components": {"split_word": {"calls": ...,
+                                                        "wall": ...,
+                                                        "cpu": ...}, ...}}}}
+The cpu time for the stage includes its worker processes.
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import pathlib
+import importlib
+from datetime import datetime
+
+REPORT_NAME = 'profile.json'
+
+# component -> [calls, wall, cpu], or None if not profiling
+STATS = None
+# component -> # of calls in progress, for recursive calls
+ACTIVE = {}
+# what enable was called with, for the worker processes
+TARGETS = None
+# os.times() and perf_counter() when enable was called
+START = None
+
+def record(component, wall, cpu):
+    """Add one call to the component's times"""
+    stats = STATS.setdefault(component, [0, 0.0, 0.0])
+    stats[0] += 1
+    stats[1] += wall
+    stats[2] += cpu
+
+def timed(component, func):
+    """Wrap func so its calls are timed as component"""
+    if inspect.isgeneratorfunction(func):
+        def wrapper(*args, **kwargs):
+            gen = func(*args, **kwargs)
+            while True:
+                (wall, cpu) = (time.perf_counter(), time.process_time())
+                try:
+                    item = next(gen)
+                except StopIteration:
+                    return
+                finally:
+                    record(component, time.perf_counter() - wall, time.process_time() - cpu)
+                yield item
+    else:
+        def wrapper(*args, **kwargs):
+            if ACTIVE.get(component):
+                return func(*args, **kwargs)
+            ACTIVE[component] = 1
+            (wall, cpu) = (time.perf_counter(), time.process_time())
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(component, time.perf_counter() - wall, time.process_time() - cpu)
+                ACTIVE[component] = 0
+    wrapper.__wrapped__ = func
+    wrapper.profile_component = component
+    return wrapper
+
+def patch(module_name, attr, component):
+    """Replace module_name.attr (or module_name.Class.attr) with a timed version"""
+    obj = importlib.import_module(module_name)
+    *path, name = attr.split('.')
+    for part in path:
+        obj = getattr(obj, part)
+    func = getattr(obj, name)
+    if getattr(func, 'profile_component', None) is not None:
+        # already done, in a forked worker
+        return
+    setattr(obj, name, timed(component, func))
+
+def enable(targets):
+    """Start timing the targets, (module name, attribute, component) tuples"""
+    global STATS, TARGETS, START  # pylint: disable=global-statement
+    STATS = {}
+    TARGETS = list(targets)
+    START = (os.times(), time.perf_counter())
+    for target in TARGETS:
+        patch(*target)
+
+def reset_after_fork():
+    """A forked process starts with no times of its own"""
+    global STATS  # pylint: disable=global-statement
+    if STATS is not None:
+        STATS = {}
+        ACTIVE.clear()
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+def init_worker(targets, initializer=None, initargs=()):
+    """Initializer for a worker process: start timing too, then run initializer"""
+    if targets is not None:
+        enable(targets)
+    if initializer is not None:
+        initializer(*initargs)
+
+def take():
+    """The times since the last take, to send back from a worker process"""
+    global STATS  # pylint: disable=global-statement
+    if STATS is None:
+        return None
+    stats = STATS
+    STATS = {}
+    return stats
+
+def call(func, *args):
+    """func(*args) in a worker process, with the worker's times from take()"""
+    return (func(*args), take())
+
+def merge(stats):
+    """Add the times sent back from a worker process"""
+    if STATS is None or stats is None:
+        return
+    for (component, (calls, wall, cpu)) in stats.items():
+        total = STATS.setdefault(component, [0, 0.0, 0.0])
+        total[0] += calls
+        total[1] += wall
+        total[2] += cpu
+
+def report_fname(profile, new_corpus_dir):
+    """The report file for the --profile argument, which can be '' for the default"""
+    if profile:
+        return pathlib.Path(profile)
+    return new_corpus_dir / 'tmp' / REPORT_NAME
+
+def write_report(fname, stage):
+    """Write the times for the stage to the report file fname
+
+    The entries for other stages already in the file are kept.
+    """
+    if STATS is None:
+        return
+    (start_times, start_wall) = START
+    end_times = os.times()
+    cpu = sum(end - start for (end, start) in zip(end_times[:4], start_times[:4]))
+    entry = {
+        'started': datetime.fromtimestamp(time.time() - (time.perf_counter() - start_wall)
+                                          ).isoformat(timespec='seconds'),
+        'argv': sys.argv,
+        'wall': time.perf_counter() - start_wall,
+        'cpu': cpu,
+        'components': {component: {'calls': stats[0], 'wall': stats[1], 'cpu': stats[2]}
+                       for (component, stats) in sorted(STATS.items())}
+    }
+    report = {'stages': {}}
+    if fname.exists():
+        with open(fname, 'r', encoding='utf-8') as fin:
+            report = json.load(fin)
+    report['stages'][stage] = entry
+    os.makedirs(fname.parent, exist_ok=True)
+    tmp_fname = fname.with_name(fname.name + '.tmp')
+    with open(tmp_fname, 'w', encoding='utf-8') as fout:
+        json.dump(report, fout, indent=4)
+    os.replace(tmp_fname, fname)
@@ -0,0 +1,75 @@
+"""Check that merge_leaves gives the same leaves as merge_leaves_legacy
+
+Reads
+<new_corpus_dir>/ 'tmp' / 'prep_psd' / FILE.txt
+and for every tree with an id, merges the leaves both in one pass with
+merge_leaves and its MERGE_RULES, and with the lambdas of the code it
+replaced, merge_leaves_legacy in merge_legacy.py, and compares the
+resulting pos, rom and children.  Differences are logged with the file
+name and tree id.
+
+This is a check for changes to MERGE_RULES, not part of the pipeline, so it
+and merge_legacy.py are kept here and not in mod_leaves.
+"""
+import sys
+import logging
+import argparse
+import pathlib
+from tqdm import tqdm
+from ppctree.tree.ppc_tree import PPCTree
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent / 'mod_leaves'))
+# pylint: disable=wrong-import-position
+from yid_leaf import YidLeaf
+from transform_trees_merge import merge_leaves
+from merge_legacy import merge_leaves_legacy
+from make_json_utils import add_rom_field
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+def leaves_summary(leaves):
+    """The parts of the merged leaves that matter for comparing"""
+    return [(leaf.pos, leaf.rom,
+             [(child.pos, child.rom) for child in leaf.children])
+            for leaf in leaves]
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Compare MERGE_RULES merging of leaves with the old code.',
+        add_help=True)
+    parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    fnames = sorted((args.new_corpus_dir / 'tmp' / 'prep_psd').glob('./*.txt'))
+
+    num_trees = 0
+    num_diffs = 0
+    for fname in tqdm(fnames):
+        with open(fname, 'r', encoding='utf-8') as fin:
+            lines = [line.rstrip('\n').split('\t') for line in fin]
+        for (tree_id, tree_str) in lines:
+            if tree_id == 'notreeid':
+                continue
+            ppc_tree = PPCTree(tree_str, term_class=YidLeaf)
+            leaves_orig = ppc_tree.nonempty_leaf_nodes
+            add_rom_field(leaves_orig)
+            merged1 = leaves_summary(
+                merge_leaves([leaf.detached_copy() for leaf in leaves_orig]))
+            merged2 = leaves_summary(
+                merge_leaves_legacy([leaf.detached_copy() for leaf in leaves_orig]))
+            num_trees += 1
+            if merged1 != merged2:
+                num_diffs += 1
+                logger.warning('%s %s\nmerge_leaves=\n%s\nmerge_leaves_legacy=\n%s\n',
+                               fname.name, tree_id, merged1, merged2)
+    logger.info('%d trees, %d differences', num_trees, num_diffs)
+    if num_diffs:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
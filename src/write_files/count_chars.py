@@ -2,6 +2,7 @@
 
 Reads
 <new_corpus_dir> / 'data' / 'json' / FILE.json
+(or data/jsonl/FILE.jsonl or data/bin/FILE.ppcb with --format)
 and writes
 <new_corpus_dir> / 'data' / 'misc' / chars.txt
 
@@ -16,36 +17,57 @@ import logging
 import argparse
 import unicodedata
 import pathlib
-import json
 from collections import Counter
 from tqdm import trange
 
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest
+import profiling
+from corpus_format import FORMATS, iter_trees
+
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# this script and the binary format reader
+STAGE_DEPS = [pathlib.Path(__file__).resolve(),
+              pathlib.Path(__file__).resolve().parent.parent / 'corpus_format.py']
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'iter_trees', 'read_file'),
+    (__name__, 'count_tree', 'count_tree'),
+]
+
+# the two files currently used for the NLP pipeline
+FILES_TO_USE = [
+    '1910e-grine-felder',
+    '1947e-royte-pomerantsen'
+    ]
+
+def count_tree(tinfo, counter, fname):
+    """Add the characters in the yid of each of the tree's leaves to counter"""
+    tree_id = tinfo['tree_id']
+    for leaf in tinfo['leaves']:
+        rom = leaf['rom']
+        for ch1 in leaf['yid']:
+            counter[ch1] += 1
+            if hex(ord(ch1)) == '0xfb44':
+                print(f'pe with dagesh '
+                      f'{rom} '
+                      f'{fname} '
+                      f'{tree_id}')
+            if ch1 in 'cjwW@':
+                print(f'has ascii {ch1} '
+                      f'{rom} '
+                      f'{fname} '
+                      f'{tree_id}')
+
 def get_counter(fnames):
     counter = Counter()
     for fnum in trange(len(fnames)):
         fname = fnames[fnum]
-        with open(fname, 'r', encoding='utf-8') as fin:
-            file_info = json.load(fin)
-        for tinfo in file_info:
-            tree_id = tinfo['tree_id']
-            for leaf in tinfo['leaves']:
-                rom = leaf['rom']
-                for ch1 in leaf['yid']:
-                    counter[ch1] += 1
-                    if hex(ord(ch1)) == '0xfb44':
-                        print(f'pe with dagesh '
-                              f'{rom} '
-                              f'{fname} '
-                              f'{tree_id}')
-                    if ch1 in 'cjwW@':
-                        print(f'has ascii {ch1} '
-                              f'{rom} '
-                              f'{fname} '
-                              f'{tree_id}')
-
-
+        for tinfo in iter_trees(fname):
+            count_tree(tinfo, counter, fname)
     return counter
 
 
@@ -80,7 +102,14 @@ def main():
     parser = argparse.ArgumentParser(
         description='count characters in extracted files',
         add_help=False)
-    parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')    
+    parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo the counts, even if their inputs are unchanged')
+    parser.add_argument('--format', choices=list(FORMATS), default='json',
+                        help='read data/json, data/jsonl or data/bin (default: json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     if len(sys.argv) == 1:
         parser.print_help()
@@ -90,24 +119,34 @@ def main():
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
-    json_dir = args.new_corpus_dir / 'data' / 'json'
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    (sub_dir, suffix) = FORMATS[args.format]
+    in_dir = args.new_corpus_dir / 'data' / sub_dir
     misc_dir = args.new_corpus_dir / 'data' / 'misc'
 
     os.makedirs(misc_dir, exist_ok=True)
 
-    files_to_use = [
-        '1910e-grine-felder',
-        '1947e-royte-pomerantsen'
-        ]
-
     #fnames = (mod_dir / 'json2').glob('./*.json')
-    fnames = [json_dir / f'{bname}.json'
-              for bname in files_to_use]
+    fnames = [in_dir / f'{bname}{suffix}'
+              for bname in FILES_TO_USE]
     fnames = list(fnames)
 
-    counter = get_counter(fnames)
-
-    write_counter(misc_dir / 'chars.txt', counter)
+    manifest = Manifest(misc_dir, STAGE_DEPS)
+    key = manifest.key(fnames)
+    out_fname = misc_dir / 'chars.txt'
+    if not args.force and manifest.is_current(out_fname, key):
+        logger.info('inputs unchanged, not redoing counts')
+    else:
+        counter = get_counter(fnames)
+
+        write_counter(out_fname, counter)
+        manifest.record(out_fname, key)
+        manifest.save()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'count_chars')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,309 @@
+"""Pretty-prints the flat tree files, the same as CorpusSearch's reformat_corpus
+
+Reads
+<new_corpus_dir> / 'data' / 'psd_flat' / FILE.psd
+and writes
+<new_corpus_dir> / 'data' / 'psd' / FILE.psd
+
+This does what pp_psd.sh does with CS_2.003.04.jar and reformat.c, without
+the JVM.  The layout is a port of CorpusSearch's print.PrintTree, and the
+movement indices are renumbered in order like its ChangeTree.orderIndices,
+including its quirks:
+- a leaf whose word starts with * or RMV, or has a : after the start,
+  puts each of its sister leaves on its own line
+- the flag for putting a phrase on a new line carries over from one tree to
+  the next, which is what puts a blank line between the trees, and at the
+  start of every file except the first one
+- a word that is all digits counts as an index, so it is renumbered along
+  with the labels that have the same index
+
+write_all.py uses TreePrinter to write data/psd in the same pass as
+data/psd_flat.  With --check DIR, the files are compared with the ones in
+DIR (the output of pp_psd.sh) instead of being written.
+
+pp_psd_fixture/ has a few flat tree files, in psd_flat/, with the quirks
+above and the blank line at the start of the second file, and the files
+CorpusSearch writes for them with reformat.c, in psd/.  --check-fixture
+checks that this gives the same files.
+"""
+import os
+import re
+import sys
+import logging
+import argparse
+import pathlib
+from tqdm import tqdm
+
+from write_flat_trees import flat_tree
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest
+import profiling
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# this script and write_flat_trees.py, for flat_tree, and the binary
+# format reader, for write_all.py
+STAGE_DEPS = [pathlib.Path(__file__).resolve(),
+              pathlib.Path(__file__).resolve().parent / 'write_flat_trees.py',
+              pathlib.Path(__file__).resolve().parent.parent / 'corpus_format.py']
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'TreePrinter.format_tree', 'format_tree'),
+]
+
+FIXTURE_DIR = pathlib.Path(__file__).resolve().parent / 'pp_psd_fixture'
+
+RE_TOKEN = re.compile(r'\(|\)|[^\s()]+')
+
+def parse_tree(tree_str):
+    """Parse a bracketed tree into [label, children] lists
+
+    A word is [word, None].  The label of a node that starts with another
+    node, like the ( ( wrapper, is ''.
+    """
+    stack = []
+    root = None
+    for token in RE_TOKEN.findall(tree_str):
+        if token == '(':
+            node = [None, []]
+            if stack:
+                parent = stack[-1]
+                if parent[0] is None:
+                    parent[0] = ''
+                parent[1].append(node)
+            else:
+                root = node
+            stack.append(node)
+        elif token == ')':
+            node = stack.pop()
+            if node[0] is None:
+                node[0] = ''
+        elif stack[-1][0] is None:
+            stack[-1][0] = token
+        else:
+            stack[-1][1].append([token, None])
+    assert root is not None and not stack, f'bad tree {tree_str}'
+    return root
+
+def iter_nodes(node):
+    """The node and all the nodes and words under it, in order"""
+    yield node
+    for child in node[1] or ():
+        yield from iter_nodes(child)
+
+def label_dex(label):
+    """The index at the end of a label (or word), or '' if there is none"""
+    dex = ''
+    for char in reversed(label):
+        if char.isdecimal():
+            dex = char + dex
+        elif char in '-=':
+            break
+        else:
+            return ''
+    return dex
+
+def last_dash(label):
+    """Position of the last - or = in the label, or -1"""
+    return max(label.rfind('-'), label.rfind('='))
+
+def order_indices(root):
+    """Renumber the indices 1, 2, ... in the order of their first label"""
+    nodes = list(iter_nodes(root))
+    dexes = [label_dex(node[0]) for node in nodes]
+    done = set()
+    groups = []
+    for (node, dex) in zip(nodes, dexes):
+        if not dex or node[1] is None or int(dex) in done:
+            continue
+        done.add(int(dex))
+        groups.append([node] + [other for (other, other_dex) in zip(nodes, dexes)
+                                if other_dex == dex and other is not node])
+    for (num, group) in enumerate(groups, 1):
+        for node in group:
+            node[0] = f'{node[0][:last_dash(node[0])+1]}{num}'
+
+def is_leaf_pos(node):
+    """Check if the node has just a word under it"""
+    return node[1] is not None and len(node[1]) == 1 and node[1][0][1] is None
+
+
+class TreePrinter:
+    """Formats trees like CorpusSearch
+
+    The state kept from one tree to the next is whether the last thing
+    looked at was a leaf, as in CorpusSearch.
+    """
+    def __init__(self):
+        self.previous_leaf = False
+
+    def start_file(self, first):
+        """Start a new file, which is the first one of the corpus if first
+
+        CorpusSearch formats all the files in one run, so every file but
+        the first starts with the blank line left from the file before.
+        """
+        self.previous_leaf = not first
+
+    def format_tree(self, tree_str):
+        """The pretty-printed tree, ending with a newline"""
+        root = parse_tree(tree_str)
+        order_indices(root)
+        out = []
+        if is_leaf_pos(root):
+            out.append(f'({root[0]} {root[1][0][0]})')
+        else:
+            self.phrase(out, 0, root)
+        out.append('\n')
+        return ''.join(out)
+
+    def write_tree(self, fout, tinfo):
+        """Write one tree from the json files"""
+        fout.write(self.format_tree(flat_tree(tinfo)))
+
+    def phrase(self, out, indent, node):
+        """Add a phrase starting at column indent"""
+        (label, daughters) = node
+        daughters = daughters or []
+        child_indent = indent + len(label) + 2
+        if self.previous_leaf:
+            out.append(make_indent(indent))
+            self.previous_leaf = False
+        out.append(f'({label} ')
+        just_leaves = self.has_just_leaves(daughters)
+        for (i, daughter) in enumerate(daughters):
+            if not is_leaf_pos(daughter):
+                self.phrase(out, child_indent, daughter)
+                continue
+            if i > 0 and not just_leaves:
+                out.append(make_indent(child_indent))
+            out.append(f'({daughter[0]} {daughter[1][0][0]})')
+            if just_leaves and i < len(daughters) - 1:
+                out.append(' ')
+        out.append(')')
+
+    def has_just_leaves(self, daughters):
+        """Check if the daughters can go on one line
+
+        They can if they are all leaves, and none of the words starts with
+        * or RMV, or has a : after the start.  Sets previous_leaf for the
+        leaves looked at.
+        """
+        for daughter in daughters:
+            if not is_leaf_pos(daughter):
+                return False
+            self.previous_leaf = True
+            word = daughter[1][0][0]
+            if word.startswith('*') or word.startswith('RMV') or word.find(':') > 0:
+                return False
+        return True
+
+def make_indent(num):
+    """New line indented to column num, with tabs for every 8 columns"""
+    return '\n' + '\t' * (num // 8) + ' ' * (num % 8)
+
+def pp_file(in_fname, first):
+    """The pretty-printed contents of one flat tree file"""
+    printer = TreePrinter()
+    printer.start_file(first)
+    out = []
+    with open(in_fname, 'r', encoding='utf-8') as fin:
+        for line in fin:
+            if line.strip():
+                out.append(printer.format_tree(line))
+    return ''.join(out)
+
+def check_file(text, check_fname):
+    """Compare text with a file written by pp_psd.sh, logging the first difference"""
+    with open(check_fname, 'r', encoding='utf-8') as fin:
+        check_text = fin.read()
+    if text == check_text:
+        return True
+    for (i, (line, check_line)) in enumerate(zip(text.split('\n'), check_text.split('\n'))):
+        if line != check_line:
+            logger.warning('%s differs at line %d: %r, not %r',
+                           check_fname, i + 1, line, check_line)
+            break
+    else:
+        logger.warning('%s differs in length', check_fname)
+    return False
+
+def check_dir(psd_flat_dir, ref_dir):
+    """Compare the pretty-printed files in psd_flat_dir with the ones in ref_dir
+
+    Returns True if they are all the same.
+    """
+    # sorted, as the shell gives them to CorpusSearch
+    fnames = sorted(psd_flat_dir.glob('./*.psd'))
+    num_same = sum(check_file(pp_file(fname, i == 0), ref_dir / fname.name)
+                   for (i, fname) in enumerate(tqdm(fnames)))
+    logger.info('%d of %d files the same', num_same, len(fnames))
+    return num_same == len(fnames)
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Pretty-print the flat tree files.',
+        add_help=True)
+    parser.add_argument('new_corpus_dir', type=pathlib.Path, nargs='?', help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--check', type=pathlib.Path, metavar='DIR',
+                        help='compare with the files in DIR written by pp_psd.sh, '
+                        'instead of writing data/psd')
+    parser.add_argument('--check-fixture', action='store_true',
+                        help='compare with the CorpusSearch output for the files in '
+                        'pp_psd_fixture, instead of doing new_corpus_dir')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    if args.check_fixture:
+        if not check_dir(FIXTURE_DIR / 'psd_flat', FIXTURE_DIR / 'psd'):
+            sys.exit(1)
+        return
+    if args.new_corpus_dir is None:
+        parser.error('new_corpus_dir is required without --check-fixture')
+
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    psd_flat_dir = args.new_corpus_dir / 'data' / 'psd_flat'
+    psd_dir = args.new_corpus_dir / 'data' / 'psd'
+
+    # sorted, as the shell gives them to CorpusSearch
+    fnames = sorted(psd_flat_dir.glob('./*.psd'))
+
+    if args.check:
+        if not check_dir(psd_flat_dir, args.check):
+            sys.exit(1)
+        return
+
+    os.makedirs(psd_dir, exist_ok=True)
+    manifest = Manifest(psd_dir, STAGE_DEPS)
+    try:
+        for (i, fname) in enumerate(tqdm(fnames)):
+            out_fname = psd_dir / fname.name
+            key = manifest.key([fname])
+            if not args.force and manifest.is_current(out_fname, key):
+                continue
+            text = pp_file(fname, i == 0)
+            with open(out_fname, 'w', encoding='utf-8') as fout:
+                fout.write(text)
+            manifest.record(out_fname, key)
+    finally:
+        manifest.save()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'pp_psd')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Write the outputs of the write_files scripts in one pass over the corpus
+
+Reads each
+<new_corpus_dir> / 'data' / 'json' / FILE.json
+(or data/jsonl/FILE.jsonl or data/bin/FILE.ppcb with --format)
+once, and gives each tree to the selected sinks:
+pos: data/pos/FILE.txt, as write_pos.py
+psd_flat: data/psd_flat/FILE.psd, as write_flat_trees.py
+psd: data/psd/FILE.psd, as pp_psd.py (or pp_psd.sh)
+word_counts: data/misc/pos_info.txt and word_info.txt, as write_pos_word_counts.py
+chars: data/misc/chars.txt, as count_chars.py
+
+The outputs are the same as running the scripts separately, and they
+share the scripts' manifests, so a file done by one is skipped by the
+other.  As for pp_psd.py, a data/psd file is keyed on its data/psd_flat
+file, which the psd sink hashes as it makes the flat trees, rather than
+reading it back.  A file that no selected sink needs is not read at all.
+"""
+import os
+import sys
+import hashlib
+import logging
+import argparse
+import pathlib
+from collections import Counter
+from tqdm import tqdm
+
+import write_pos
+import write_flat_trees
+import pp_psd
+import write_pos_word_counts
+import count_chars
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest
+import profiling
+from corpus_format import FORMATS, iter_trees
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# the functions timed with --profile: reading, and the work for each sink
+PROFILE_TARGETS = [
+    (__name__, 'iter_trees', 'read_file'),
+    ('write_pos', 'write_tree', 'pos'),
+    ('write_flat_trees', 'write_tree', 'psd_flat'),
+    ('pp_psd', 'TreePrinter.format_tree', 'psd'),
+    ('write_pos_word_counts', 'count_tree', 'word_counts'),
+    ('count_chars', 'count_tree', 'chars'),
+]
+
+class FileSink:
+    """Writes one output file for each input file
+
+    Parameters
+    ==========
+    out_dir: Path
+        output directory
+    out_suffix: str
+        suffix of the output files
+    write_tree: function
+        write_tree(fout, tinfo) writes the output for one tree
+    dep_fnames: list of Path
+        the files the output depends on, for the manifest
+    force: boolean
+        if true, redo all the files
+    """
+    def __init__(self, out_dir, out_suffix, write_tree, dep_fnames, force):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.out_suffix = out_suffix
+        self.write_tree = write_tree
+        self.force = force
+        self.manifest = Manifest(out_dir, dep_fnames)
+        self.fout = None
+        self.out_fname = None
+        self.key = None
+
+    def wants(self, fname):
+        """Check if the output for fname has to be redone"""
+        out_fname = self.out_dir / f'{fname.stem}{self.out_suffix}'
+        key = self.manifest.key([fname])
+        if not self.force and self.manifest.is_current(out_fname, key):
+            return False
+        (self.out_fname, self.key) = (out_fname, key)
+        return True
+
+    def start_file(self, fname):  # pylint: disable=unused-argument
+        """Start the output for the input fname"""
+        self.fout = open(self.out_fname, 'w', encoding='utf-8')
+
+    def tree(self, tinfo):
+        """Write the output for one tree"""
+        self.write_tree(self.fout, tinfo)
+
+    def end_file(self):
+        """Finish the output for the current file"""
+        self.fout.close()
+        self.fout = None
+        self.manifest.record(self.out_fname, self.key)
+
+    def finish(self, completed):  # pylint: disable=unused-argument
+        """Save the manifest, with the files that were finished"""
+        if self.fout is not None:
+            self.fout.close()
+        self.manifest.save()
+
+
+class PsdSink(FileSink):
+    """FileSink for pp_psd.py, which has to know which file is the first one
+
+    The output is keyed on the psd_flat file, as by pp_psd.py.  The psd
+    file is up to date if the psd_flat file is (by its own manifest) and
+    the psd file was made from it.  Otherwise it is redone, and the key is
+    made from the flat trees written for it.
+
+    Parameters
+    ==========
+    out_dir: Path
+        output directory
+    flat_dir: Path
+        the directory of the psd_flat files
+    first_fname: Path
+        the first input file of the corpus
+    force: boolean
+        if true, redo all the files
+    """
+    def __init__(self, out_dir, flat_dir, first_fname, force):
+        self.printer = pp_psd.TreePrinter()
+        self.flat_dir = flat_dir
+        self.flat_manifest = Manifest(flat_dir, write_flat_trees.STAGE_DEPS)
+        self.first_fname = first_fname
+        self.flat_fname = None
+        self.flat_sha = None
+        super().__init__(out_dir, '.psd', self.printer.write_tree,
+                         pp_psd.STAGE_DEPS, force)
+
+    def wants(self, fname):
+        """Check if the output for fname has to be redone"""
+        out_fname = self.out_dir / f'{fname.stem}.psd'
+        flat_fname = self.flat_dir / f'{fname.stem}.psd'
+        if (not self.force and
+                self.flat_manifest.is_current(flat_fname, self.flat_manifest.key([fname])) and
+                self.manifest.is_current(out_fname, self.manifest.key([flat_fname]))):
+            return False
+        (self.out_fname, self.flat_fname) = (out_fname, flat_fname)
+        return True
+
+    def start_file(self, fname):
+        """Start the output for the input fname"""
+        super().start_file(fname)
+        self.printer.start_file(fname == self.first_fname)
+        self.flat_sha = hashlib.sha256()
+
+    def tree(self, tinfo):
+        """Write the output for one tree"""
+        tree_str = write_flat_trees.flat_tree(tinfo)
+        self.flat_sha.update(f'{tree_str}\n'.encode('utf-8'))
+        self.fout.write(self.printer.format_tree(tree_str))
+
+    def end_file(self):
+        """Finish the output for the current file"""
+        self.key = self.manifest.key_for_hashes([(self.flat_fname.name,
+                                                  self.flat_sha.hexdigest())])
+        super().end_file()
+
+
+class CountSink:
+    """Counts over the trees of some of the input files, and writes them at the end
+
+    Parameters
+    ==========
+    out_dir: Path
+        output directory
+    in_fnames: list of Path
+        the input files to count
+    out_names: list of str
+        the files the counts are written to, in out_dir
+    count_tree: function
+        count_tree(tinfo, fname) counts one tree
+    write_counts: function
+        write_counts() writes all the counts
+    dep_fnames: list of Path
+        the files the output depends on, for the manifest
+    force: boolean
+        if true, redo the counts
+    """
+    def __init__(self, out_dir, in_fnames, out_names, count_tree, write_counts,
+                 dep_fnames, force):
+        os.makedirs(out_dir, exist_ok=True)
+        self.in_fnames = in_fnames
+        self.out_fnames = [out_dir / out_name for out_name in out_names]
+        self.count_tree = count_tree
+        self.write_counts = write_counts
+        self.manifest = Manifest(out_dir, dep_fnames)
+        self.key = self.manifest.key(in_fnames)
+        self.active = force or not all(self.manifest.is_current(out_fname, self.key)
+                                       for out_fname in self.out_fnames)
+        if not self.active:
+            logger.info('inputs unchanged, not redoing %s',
+                        ' '.join(out_name for out_name in out_names))
+        self.fname = None
+
+    def wants(self, fname):
+        """Check if fname is counted"""
+        return self.active and fname in self.in_fnames
+
+    def start_file(self, fname):
+        """Start counting the trees of fname"""
+        self.fname = fname
+
+    def tree(self, tinfo):
+        """Count one tree"""
+        self.count_tree(tinfo, self.fname)
+
+    def end_file(self):
+        """Nothing to do until all the files are counted"""
+
+    def finish(self, completed):
+        """Write the counts, if all the files were counted"""
+        if not self.active or not completed:
+            return
+        self.write_counts()
+        for out_fname in self.out_fnames:
+            self.manifest.record(out_fname, self.key)
+        self.manifest.save()
+
+
+def make_word_counts_sink(in_dir, suffix, misc_dir, force):
+    """Sink for write_pos_word_counts.py"""
+    pos2word2count = Counter()
+    word2pos2count = Counter()
+    def write_counts():
+        write_pos_word_counts.write_pos(pos2word2count, misc_dir)
+        write_pos_word_counts.write_words(word2pos2count, misc_dir)
+    return CountSink(misc_dir,
+                     [in_dir / f'{bname}{suffix}'
+                      for bname in write_pos_word_counts.FILES_TO_USE],
+                     ['pos_info.txt', 'word_info.txt'],
+                     lambda tinfo, fname: write_pos_word_counts.count_tree(
+                         tinfo, pos2word2count, word2pos2count),
+                     write_counts, write_pos_word_counts.STAGE_DEPS, force)
+
+def make_chars_sink(in_dir, suffix, misc_dir, force):
+    """Sink for count_chars.py"""
+    counter = Counter()
+    return CountSink(misc_dir,
+                     [in_dir / f'{bname}{suffix}'
+                      for bname in count_chars.FILES_TO_USE],
+                     ['chars.txt'],
+                     lambda tinfo, fname: count_chars.count_tree(tinfo, counter, fname),
+                     lambda: count_chars.write_counter(misc_dir / 'chars.txt', counter),
+                     count_chars.STAGE_DEPS, force)
+
+SINKS = ('pos', 'psd_flat', 'psd', 'word_counts', 'chars')
+
+def make_sinks(names, new_corpus_dir, in_dir, suffix, fnames, force):
+    """Make the sinks with the given names"""
+    data_dir = new_corpus_dir / 'data'
+    sinks = []
+    for name in names:
+        if name == 'pos':
+            sinks.append(FileSink(data_dir / 'pos', '.txt', write_pos.write_tree,
+                                  write_pos.STAGE_DEPS, force))
+        elif name == 'psd_flat':
+            sinks.append(FileSink(data_dir / 'psd_flat', '.psd', write_flat_trees.write_tree,
+                                  write_flat_trees.STAGE_DEPS, force))
+        elif name == 'psd':
+            sinks.append(PsdSink(data_dir / 'psd', data_dir / 'psd_flat',
+                                  fnames[0] if fnames else None, force))
+        elif name == 'word_counts':
+            sinks.append(make_word_counts_sink(in_dir, suffix, data_dir / 'misc', force))
+        elif name == 'chars':
+            sinks.append(make_chars_sink(in_dir, suffix, data_dir / 'misc', force))
+    return sinks
+
+def main():
+    """main loop"""
+    parser = argparse.ArgumentParser(
+        description='Write the pos, tree and count files in one pass.',
+        add_help=True)
+    parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--sinks', nargs='+', choices=SINKS, default=list(SINKS),
+                        help='outputs to write (default: all)')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--format', choices=list(FORMATS), default='json',
+                        help='read data/json, data/jsonl or data/bin (default: json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
+                        level=logging.INFO)
+
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    (sub_dir, suffix) = FORMATS[args.format]
+    in_dir = args.new_corpus_dir / 'data' / sub_dir
+
+    # sorted, so the counts are done in the same order as by the scripts,
+    # and the first file is the one CorpusSearch does first
+    fnames = sorted(in_dir.glob(f'./*{suffix}'))
+
+    sinks = make_sinks(dict.fromkeys(args.sinks), args.new_corpus_dir,
+                       in_dir, suffix, fnames, args.force)
+    completed = False
+    try:
+        for fname in tqdm(fnames):
+            file_sinks = [sink for sink in sinks if sink.wants(fname)]
+            if not file_sinks:
+                continue
+            for sink in file_sinks:
+                sink.start_file(fname)
+            for tinfo in iter_trees(fname):
+                for sink in file_sinks:
+                    sink.tree(tinfo)
+            for sink in file_sinks:
+                sink.end_file()
+        completed = True
+    finally:
+        for sink in sinks:
+            sink.finish(completed)
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'write_all')
+
+if __name__ == '__main__':
+    main()
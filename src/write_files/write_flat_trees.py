@@ -2,56 +2,98 @@
 
 Reads
 <new_corpus_dir> / 'data' / 'json' / FILE.json
+(or data/jsonl/FILE.jsonl or data/bin/FILE.ppcb with --format)
 and writes
 <new_corpus_dir> / 'data' / 'psd_flat' / FILE.psd
 
-After this step, CorpusSearch is used to pretty-print the trees.
+After this step, pp_psd.py pretty-prints the trees (write_all.py
+writes both in one pass).
 """
 import os
+import sys
 import logging
 import argparse
 import pathlib
-import json
-from tqdm import trange
+from tqdm import tqdm
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest
+import profiling
+from corpus_format import FORMATS, iter_trees
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# this script and the binary format reader
+STAGE_DEPS = [pathlib.Path(__file__).resolve(),
+              pathlib.Path(__file__).resolve().parent.parent / 'corpus_format.py']
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'iter_trees', 'read_file'),
+    (__name__, 'write_tree', 'write_tree'),
+]
+
+def flat_tree(tinfo):
+    """One tree on one line, with its ID put back"""
+    tree_id = tinfo['tree_id']
+    tree = tinfo['tree']
+    if tree_id == 'notreeid':
+        return f'( {tree})'
+    return f'( {tree}(ID {tree_id}))'
+
+def write_tree(fout, tinfo):
+    """Write one tree on one line, with its ID put back"""
+    fout.write(f'{flat_tree(tinfo)}\n')
+
 def main():
     """main loop"""
     parser = argparse.ArgumentParser(
         description='Convert .psd files to form for futher processing.',
         add_help=True)
     parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--format', choices=list(FORMATS), default='json',
+                        help='read data/json, data/jsonl or data/bin (default: json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     args = parser.parse_args()
 
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
-    json_dir = args.new_corpus_dir / 'data' / 'json'
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    (sub_dir, suffix) = FORMATS[args.format]
+    in_dir = args.new_corpus_dir / 'data' / sub_dir
     psd_flat_dir = args.new_corpus_dir / 'data' / 'psd_flat'
 
     os.makedirs(psd_flat_dir, exist_ok=True)
 
-    fnames = (json_dir).glob('./*.json')
+    fnames = in_dir.glob(f'./*{suffix}')
     fnames = list(fnames)
 
-    for fnum in trange(len(fnames)):
-        fname = fnames[fnum]
-
-        with open(fname, 'r', encoding='utf-8') as fin:
-            file_info = json.load(fin)
-
-        with open(psd_flat_dir / f'{fname.stem}.psd',
-                  'w', encoding='utf-8') as fout:
+    manifest = Manifest(psd_flat_dir, STAGE_DEPS)
+    try:
+        for fname in tqdm(fnames):
+            out_fname = psd_flat_dir / f'{fname.stem}.psd'
+            key = manifest.key([fname])
+            if not args.force and manifest.is_current(out_fname, key):
+                continue
 
-            for tinfo in file_info:
-                tree_id = tinfo['tree_id']
-                tree = tinfo['tree']
-                if tree_id == 'notreeid':
-                    fout.write(f'( {tree})\n')
-                else:
-                    fout.write(f'( {tree}(ID {tree_id}))\n')
+            with open(out_fname, 'w', encoding='utf-8') as fout:
+                for tinfo in iter_trees(fname):
+                    write_tree(fout, tinfo)
+            manifest.record(out_fname, key)
+    finally:
+        manifest.save()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'write_flat_trees')
 
 if __name__ == '__main__':
     main()
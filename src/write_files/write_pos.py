@@ -2,67 +2,105 @@
 
 Reads
 <new_corpus_dir> / 'data' / 'json' / FILE.json
+(or data/jsonl/FILE.jsonl or data/bin/FILE.ppcb with --format)
 and writes
 <new_corpus_dir> / 'data' / 'pos' / FILE.txt
 """
 import os
+import sys
 import logging
 import argparse
 import pathlib
-import json
-from tqdm import trange
+from tqdm import tqdm
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest
+import profiling
+from corpus_format import FORMATS, iter_trees
 
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# this script and the binary format reader
+STAGE_DEPS = [pathlib.Path(__file__).resolve(),
+              pathlib.Path(__file__).resolve().parent.parent / 'corpus_format.py']
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'iter_trees', 'read_file'),
+    (__name__, 'write_tree', 'write_tree'),
+]
+
+def write_tree(fout, tinfo):
+    """Write the SENT line and a line for each leaf of one tree"""
+    tree_id = tinfo['tree_id']
+    if tree_id == 'notreeid':
+        return
+    fout.write(f'SENT\t{tree_id}\n')
+
+    #tree_leaves = [leaf for leaf in tinfo['leaves']
+    #               if leaf['ltype'] in ('st', 's')]
+    for leaf in tinfo['leaves']:
+        if "end" in leaf:
+            num = f"{leaf['start']}-{leaf['end']}"
+        else:
+            num = leaf['start']
+        rom  = leaf['rom']
+        ycode = leaf['ycode']
+        yid = leaf['yid']
+        pos = leaf['pos']
+        gloss = leaf.get('gloss', '_')
+        fout.write(f'{num}\t{rom}\t{pos}\t{yid}\t{ycode}\t{gloss}\n')
+    fout.write('\n')
+
 def main():
     """main loop"""
     parser = argparse.ArgumentParser(
         description='Convert .psd files to form for futher processing.',
         add_help=True)
     parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo all files, even if their inputs are unchanged')
+    parser.add_argument('--format', choices=list(FORMATS), default='json',
+                        help='read data/json, data/jsonl or data/bin (default: json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     args = parser.parse_args()
 
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
-    json_dir = args.new_corpus_dir / 'data' / 'json'
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    (sub_dir, suffix) = FORMATS[args.format]
+    in_dir = args.new_corpus_dir / 'data' / sub_dir
     pos_dir = args.new_corpus_dir / 'data' / 'pos'
 
     os.makedirs(pos_dir, exist_ok=True)
 
-    fnames = (json_dir).glob('./*.json')
+    fnames = in_dir.glob(f'./*{suffix}')
     fnames = list(fnames)
 
-    for fnum in trange(len(fnames)):
-        fname = fnames[fnum]
-
-        with open(fname, 'r', encoding='utf-8') as fin:
-            file_info = json.load(fin)
-
-        with open(pos_dir / f'{fname.stem}.txt',
-                  'w', encoding='utf-8') as fout:
-
-            for tinfo in file_info:
-                tree_id = tinfo['tree_id']
-                if tree_id == 'notreeid':
-                    continue
-                fout.write(f'SENT\t{tree_id}\n')
-
-                #tree_leaves = [leaf for leaf in tinfo['leaves']
-                #               if leaf['ltype'] in ('st', 's')]
-                for leaf in tinfo['leaves']:
-                    if "end" in leaf:
-                        num = f"{leaf['start']}-{leaf['end']}"
-                    else:
-                        num = leaf['start']
-                    rom  = leaf['rom']
-                    ycode = leaf['ycode']
-                    yid = leaf['yid']
-                    pos = leaf['pos']
-                    gloss = leaf.get('gloss', '_')
-                    fout.write(f'{num}\t{rom}\t{pos}\t{yid}\t{ycode}\t{gloss}\n')
-                fout.write('\n')
+    manifest = Manifest(pos_dir, STAGE_DEPS)
+    try:
+        for fname in tqdm(fnames):
+            out_fname = pos_dir / f'{fname.stem}.txt'
+            key = manifest.key([fname])
+            if not args.force and manifest.is_current(out_fname, key):
+                continue
+
+            with open(out_fname, 'w', encoding='utf-8') as fout:
+                for tinfo in iter_trees(fname):
+                    write_tree(fout, tinfo)
+            manifest.record(out_fname, key)
+    finally:
+        manifest.save()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'write_pos')
 
 if __name__ == '__main__':
     main()
@@ -2,6 +2,7 @@
 
 Reads
 <new_corpus_dir> / 'data' / 'json' / FILE.json
+(or data/jsonl/FILE.jsonl or data/bin/FILE.ppcb with --format)
 and writes
 <new_corpus_dir> / 'data' / 'misc' / 'pos_info.txt'
 <new_corpus_dir> / 'data' / 'misc' / 'word_info.txt'
@@ -15,11 +16,32 @@ import logging
 import argparse
 import unicodedata
 import pathlib
-import json
 from collections import Counter
 
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+# pylint: disable=wrong-import-position
+from manifest import Manifest
+import profiling
+from corpus_format import FORMATS, iter_trees
+
 logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# this script and the binary format reader
+STAGE_DEPS = [pathlib.Path(__file__).resolve(),
+              pathlib.Path(__file__).resolve().parent.parent / 'corpus_format.py']
+
+# the functions timed with --profile
+PROFILE_TARGETS = [
+    (__name__, 'iter_trees', 'read_file'),
+    (__name__, 'count_tree', 'count_tree'),
+]
+
+# the two files currently used for the NLP pipeline
+FILES_TO_USE = [
+    '1910e-grine-felder',
+    '1947e-royte-pomerantsen'
+    ]
+
 def write_counter(out_fname, counter):
     """Write the combined counter
 
@@ -45,27 +67,28 @@ def write_counter(out_fname, counter):
 
             #f'{unicodedata.category(chr1)}\n')
 
+def count_tree(tinfo, pos2word2count, word2pos2count):
+    """Count the (pos, word) of each source leaf of one tree"""
+    #tree_id = tinfo['tree_id']
+    s_leaves = [leaf for leaf in tinfo['leaves']
+                if leaf['ltype'] in ('st', 's')]
+
+    for leaf in s_leaves:
+        rom = leaf['rom']
+        pos = leaf['pos']
+        if pos not in pos2word2count:
+            pos2word2count[pos] = Counter()
+        pos2word2count[pos][rom] += 1
+        if rom not in word2pos2count:
+            word2pos2count[rom] = Counter()
+        word2pos2count[rom][pos] += 1
+
 def get_counters(fnames):
     pos2word2count = Counter()
     word2pos2count = Counter()
     for fname in fnames:
-        with open(fname, 'r', encoding='utf-8') as fin:
-            file_info = json.load(fin)
-
-        for tinfo in file_info:
-            #tree_id = tinfo['tree_id']
-            s_leaves = [leaf for leaf in tinfo['leaves']
-                        if leaf['ltype'] in ('st', 's')]
-
-            for leaf in s_leaves:
-                rom = leaf['rom']
-                pos = leaf['pos']
-                if pos not in pos2word2count:
-                    pos2word2count[pos] = Counter()
-                pos2word2count[pos][rom] += 1
-                if rom not in word2pos2count:
-                    word2pos2count[rom] = Counter()
-                word2pos2count[rom][pos] += 1
+        for tinfo in iter_trees(fname):
+            count_tree(tinfo, pos2word2count, word2pos2count)
     return pos2word2count, word2pos2count
 
 def write_pos(pos2word2count, misc_dir):
@@ -121,6 +144,13 @@ def main():
         description='count characters in extracted files',
         add_help=False)
     parser.add_argument('new_corpus_dir', type=pathlib.Path, help='new corpus')
+    parser.add_argument('--force', action='store_true',
+                        help='redo the counts, even if their inputs are unchanged')
+    parser.add_argument('--format', choices=list(FORMATS), default='json',
+                        help='read data/json, data/jsonl or data/bin (default: json)')
+    parser.add_argument('--profile', nargs='?', const='', metavar='FILE',
+                        help='add the times for the parts of this stage to FILE '
+                        '(default: <new_corpus_dir>/tmp/profile.json)')
 
     if len(sys.argv) == 1:
         parser.print_help()
@@ -130,24 +160,36 @@ def main():
     logging.basicConfig(format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
                         level=logging.INFO)
 
-    json_dir = args.new_corpus_dir / 'data' / 'json'
+    if args.profile is not None:
+        profiling.enable(PROFILE_TARGETS)
+
+    (sub_dir, suffix) = FORMATS[args.format]
+    in_dir = args.new_corpus_dir / 'data' / sub_dir
     misc_dir = args.new_corpus_dir / 'data' / 'misc'
 
     os.makedirs(misc_dir, exist_ok=True)
 
-    files_to_use = [
-        '1910e-grine-felder',
-        '1947e-royte-pomerantsen'
-        ]
-
     #fnames = (mod_dir / 'json2').glob('./*.json')
-    fnames = [json_dir / f'{bname}.json'
-              for bname in files_to_use]
+    fnames = [in_dir / f'{bname}{suffix}'
+              for bname in FILES_TO_USE]
     fnames = list(fnames)
 
-    (pos2word2count, word2pos2count) = get_counters(fnames)
-    write_pos(pos2word2count, misc_dir)
-    write_words(word2pos2count, misc_dir)
+    manifest = Manifest(misc_dir, STAGE_DEPS)
+    key = manifest.key(fnames)
+    out_fnames = [misc_dir / 'pos_info.txt', misc_dir / 'word_info.txt']
+    if not args.force and all(manifest.is_current(out_fname, key)
+                              for out_fname in out_fnames):
+        logger.info('inputs unchanged, not redoing counts')
+    else:
+        (pos2word2count, word2pos2count) = get_counters(fnames)
+        write_pos(pos2word2count, misc_dir)
+        write_words(word2pos2count, misc_dir)
+        for out_fname in out_fnames:
+            manifest.record(out_fname, key)
+        manifest.save()
+    if args.profile is not None:
+        profiling.write_report(profiling.report_fname(args.profile, args.new_corpus_dir),
+                               'write_pos_word_counts')
 
 
 if __name__ == '__main__':